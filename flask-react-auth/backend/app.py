@@ -23,20 +23,103 @@ Groupes de routes:
 # === IMPORTS DES BIBLIOTHÈQUES ===
 
 # Flask: Framework web pour créer l'application et gérer les routes
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
+# stream_with_context: Garde la requête (et la session SQLAlchemy) active pendant une réponse envoyée en morceaux
+from flask import stream_with_context
+# JSONProvider: Point d'extension de Flask pour choisir la bibliothèque JSON utilisée par jsonify()
+from flask.json.provider import JSONProvider
+# orjson: Encodeur/décodeur JSON écrit en Rust, bien plus rapide que le module json standard
+import orjson
 # CORS (Cross-Origin Resource Sharing): Permet au frontend (port 3000) de communiquer avec le backend (port 5000)
 # Sans CORS, les navigateurs bloquent les requêtes entre différents ports (sécurité)
 from flask_cors import CORS
 # Import des modèles de base de données définis dans models.py
-from models import db, User, Post, Comment, Like
+from models import db, User, Post, Comment, PostLike, CommentLike, hash_password, create_post_search_index
+from models import configure_password_hasher, migrate_legacy_likes, rebuild_outdated_tables
 # Import de la configuration de l'application
 from config import Config
 # JWT (JSON Web Token): Bibliothèque pour créer et vérifier les tokens d'authentification
 import jwt
-# datetime et timedelta: Pour gérer les dates et les durées (expiration des tokens)
-from datetime import datetime, timedelta
+# datetime: Pour lire la date contenue dans le curseur de pagination (voir get_posts)
+from datetime import datetime
 # wraps: Décorateur utilitaire pour préserver les métadonnées des fonctions décorées
 from functools import wraps
+# partial: Crée une version d'une fonction avec certains arguments déjà fixés
+from functools import partial
+# lru_cache: Mémorise les derniers résultats d'une fonction (cache des recherches)
+from functools import lru_cache
+# hashlib: Pour calculer l'empreinte SHA-256 des tokens (clé du cache de tokens)
+import hashlib
+# hmac, base64: Briques de base pour signer et encoder les tokens JWT (voir encode_jwt)
+import hmac
+import base64
+# threading: Verrou pour protéger le cache partagé entre les threads du serveur
+import threading
+# time: Horloge utilisée pour vérifier l'expiration des tokens en cache
+import time
+# TTLCache: Dictionnaire borné dont les entrées expirent automatiquement après un délai
+from cachetools import TTLCache
+# ThreadPoolExecutor: Pool de threads borné pour les calculs de hachage de mots de passe
+from concurrent.futures import ThreadPoolExecutor
+# make_transient_to_detached: Permet de rattacher un utilisateur reconstruit depuis le cache sans SELECT
+from sqlalchemy.orm import make_transient_to_detached
+# tuple_: Comparaison de plusieurs colonnes à la fois, ex: (created_at, id) < (date, 42)
+from sqlalchemy import tuple_, or_
+# select/func/delete/insert/exists: Construction de requêtes SQL (sous-requêtes de comptage, suppressions groupées,
+# insertions avec RETURNING, tests d'existence)
+from sqlalchemy import select, func, delete, insert, exists
+# IntegrityError: Levée par la base quand une contrainte (ex: UNIQUE) est violée
+from sqlalchemy.exc import IntegrityError
+# insert() propres à SQLite/PostgreSQL: INSERT ... ON CONFLICT DO NOTHING (voir insert_ignoring_duplicates)
+from sqlalchemy.dialects import sqlite, postgresql
+# selectinload/raiseload: Contrôle du chargement des relations (évite le problème N+1)
+from sqlalchemy.orm import selectinload, raiseload, configure_mappers, undefer
+# event/Session: Pour réagir aux commits de la base de données (invalidation des caches)
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+# FunctionElement/compiles/String: Pour définir une fonction SQL qui s'écrit différemment selon la base
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy import String
+# Engine/sqlite3: Pour régler chaque connexion SQLite à son ouverture (PRAGMA)
+from sqlalchemy.engine import Engine
+import sqlite3
+
+# === SÉRIALISATION JSON ===
+
+class ORJSONProvider(JSONProvider):
+    """
+    Fournisseur JSON de Flask basé sur orjson
+    ==========================================
+
+    Une fois installé (app.json = ORJSONProvider(app)), tous les appels à jsonify()
+    et request.get_json() passent par orjson au lieu du module json standard.
+    Les routes n'ont pas besoin d'être modifiées.
+
+    orjson produit directement des octets (bytes): la réponse HTTP est construite
+    sans conversion intermédiaire en chaîne de caractères.
+
+    Les dates (datetime) sont écrites directement par orjson au format ISO 8601,
+    comme datetime.isoformat(): les to_dict() des modèles les laissent telles quelles.
+
+    Les to_dict() retournent des dictionnaires ordinaires et non des objets typés
+    (msgspec.Struct, dataclass...): les routes les complètent (auteur, compteurs) et
+    orjson encode un dict aussi vite qu'une structure, en C, sans étape intermédiaire.
+    """
+
+    def dumps(self, obj, **kwargs):
+        # Utilisé par flask.json.dumps(): doit retourner une chaîne (str)
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        # Utilisé par request.get_json(): accepte str ou bytes
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Utilisé par jsonify(): construit la réponse directement à partir des octets
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
+
 
 # === INITIALISATION DE L'APPLICATION FLASK ===
 
@@ -48,6 +131,9 @@ app = Flask(__name__)
 # Cela configure: SECRET_KEY, DATABASE_URI, JWT_EXPIRATION, etc.
 app.config.from_object(Config)
 
+# Remplacement du module json standard par orjson pour jsonify() et request.get_json()
+app.json = ORJSONProvider(app)
+
 # Activation de CORS pour permettre les requêtes du frontend
 # Sans cette ligne, le navigateur bloquerait les appels API du frontend vers le backend
 CORS(app)
@@ -57,6 +143,670 @@ CORS(app)
 db.init_app(app)
 
 
+# === RÉGLAGES SQLITE ===
+
+# PRAGMA appliqués à chaque nouvelle connexion SQLite (une fois par connexion du pool)
+SQLITE_PRAGMAS = (
+    # WAL: Les lectures ne sont plus bloquées pendant une écriture (et inversement)
+    'PRAGMA journal_mode=WAL',
+    # NORMAL: Suffisant avec WAL, évite une synchronisation disque à chaque commit
+    'PRAGMA synchronous=NORMAL',
+    # Tables temporaires (tris, sous-requêtes) gardées en mémoire
+    'PRAGMA temp_store=MEMORY',
+    # Lecture du fichier par mmap (256 Mo) et cache de pages de 64 Mo (valeur négative = en Ko)
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-64000',
+    # Attend jusqu'à 5 secondes qu'un autre processus libère la base au lieu d'échouer
+    'PRAGMA busy_timeout=5000',
+    # Vérification des clés étrangères (désactivée par défaut dans SQLite):
+    # un commentaire ou un like vers un post inexistant est refusé par la base
+    'PRAGMA foreign_keys=ON',
+)
+
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Applique SQLITE_PRAGMAS à chaque nouvelle connexion SQLite
+
+    Branché sur l'événement 'connect' de SQLAlchemy: appelé une seule fois par connexion,
+    les connexions étant ensuite réutilisées par le pool. Sans effet sur les autres bases.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+# === RÉPONSES D'ERREUR PRÉCALCULÉES ===
+
+def static_error(message, status):
+    """
+    Prépare une réponse d'erreur dont le contenu ne change jamais
+    ==============================================================
+
+    Le JSON {"message": ...} est encodé une seule fois, au démarrage.
+    Chaque appel ne fait plus que construire la Response autour de ces octets.
+
+    Note: On crée une nouvelle Response à chaque fois plutôt que de partager un objet
+    unique, car Flask-CORS (et Flask) ajoutent des en-têtes à la réponse envoyée.
+
+    Utilisation:
+        ERR_EXEMPLE = static_error('Exemple', 400)
+        return ERR_EXEMPLE()
+    """
+    body = orjson.dumps({'message': message})
+    return partial(app.response_class, body, status=status, mimetype='application/json')
+
+
+# Erreurs des décorateurs d'authentification (les plus sollicitées par les requêtes malveillantes)
+ERR_TOKEN_MISSING = static_error('Token manquant', 401)
+ERR_TOKEN_EXPIRED = static_error('Token expiré', 401)
+ERR_TOKEN_INVALID = static_error('Token invalide', 401)
+ERR_TOKEN_USER = static_error('Utilisateur non trouvé', 401)
+ERR_ADMIN = static_error('Accès refusé - droits administrateur requis', 403)
+
+# Erreurs de validation et de connexion
+ERR_INCOMPLETE = static_error('Données incomplètes', 400)
+ERR_BAD_CREDENTIALS = static_error('Identifiants incorrects', 401)
+ERR_POST_FIELDS = static_error('Titre et contenu requis', 400)
+ERR_CONTENT_REQUIRED = static_error('Contenu requis', 400)
+ERR_PASSWORD_FIELDS = static_error('Mot de passe actuel et nouveau mot de passe requis', 400)
+
+
+# === SIGNATURE DES TOKENS JWT ===
+
+def _b64url(raw):
+    """
+    Encode des octets en base64 "URL-safe" sans le padding '=' (format imposé par JWT)
+    """
+    return base64.urlsafe_b64encode(raw).rstrip(b'=')
+
+
+# Un JWT a la forme: base64(en-tête) + '.' + base64(payload) + '.' + base64(signature)
+# L'en-tête est toujours le même pour nos tokens: on l'encode une seule fois au démarrage
+_JWT_HEADER = _b64url(b'{"alg":"HS256","typ":"JWT"}')
+
+# Clé secrète convertie en octets une seule fois au démarrage
+_JWT_KEY = app.config['SECRET_KEY'].encode()
+
+# Prototype HMAC-SHA256 initialisé avec la clé secrète une seule fois
+# Pour chaque token on en fait une copie (.copy()), bien moins coûteuse que de repartir de la clé
+_JWT_SIGNER = hmac.new(_JWT_KEY, digestmod=hashlib.sha256)
+
+# Vérification des tokens: jwt.decode() avec la clé et l'algorithme déjà fixés
+# Évite à chaque requête la lecture de app.config et la création de la liste des algorithmes
+# decode_jwt(token) vérifie la signature et l'expiration, et retourne le payload
+decode_jwt = partial(jwt.decode, key=_JWT_KEY, algorithms=('HS256',))
+
+# Durée de validité d'un token en secondes (JWT_EXPIRATION_DELTA de config.py, 24h par défaut)
+# Le claim 'exp' d'un JWT est un nombre de secondes depuis le 01/01/1970 (UTC):
+# exp = int(time.time()) + JWT_TTL_SECONDS, sans passer par des objets datetime
+JWT_TTL_SECONDS = int(app.config['JWT_EXPIRATION_DELTA'].total_seconds())
+
+
+def encode_jwt(payload):
+    """
+    Crée un token JWT signé en HS256
+
+    Paramètre:
+        payload (dict): Données du token (ex: {'user_id': 1, 'exp': 1700000000})
+
+    Retour:
+        str: Token au format "en-tête.payload.signature"
+
+    Produit exactement le même format que jwt.encode(): les tokens sont vérifiés
+    par PyJWT dans token_required. On évite seulement le travail que PyJWT refait
+    à chaque appel (choix de l'algorithme, préparation de la clé, validation des arguments).
+    """
+    body = _JWT_HEADER + b'.' + _b64url(orjson.dumps(payload))
+    signer = _JWT_SIGNER.copy()
+    signer.update(body)
+    return (body + b'.' + _b64url(signer.digest())).decode()
+
+
+# === CACHE DES TOKENS JWT ===
+
+# Cache des tokens déjà vérifiés: empreinte SHA-256 du token → (exp, user_id, colonnes de l'utilisateur, claims)
+# - maxsize: Nombre maximum de tokens gardés en mémoire (les plus anciens sont évincés)
+# - ttl: Durée de vie d'une entrée, courte pour borner la fenêtre de révocation
+# On ne stocke PAS l'objet User lui-même: il est lié à la session SQLAlchemy de la requête
+# qui l'a chargé, on garde donc une simple copie de ses colonnes.
+_token_cache = TTLCache(maxsize=app.config['TOKEN_CACHE_SIZE'], ttl=app.config['TOKEN_CACHE_TTL'])
+# Cache des réponses de GET /api/me: empreinte du token → (exp, user_id, corps JSON déjà encodé)
+# Le frontend appelle /api/me à chaque chargement de page: on renvoie directement les octets
+_me_cache = TTLCache(maxsize=app.config['TOKEN_CACHE_SIZE'], ttl=app.config['ME_CACHE_TTL'])
+# Les caches cachetools ne sont pas thread-safe: tous les accès passent par ce verrou
+_token_cache_lock = threading.Lock()
+
+
+def _cached_user(snapshot):
+    """
+    Reconstruit un utilisateur à partir des colonnes gardées en cache
+
+    L'objet est rattaché à la session courante sans requête SQL: SQLAlchemy
+    le considère comme déjà chargé depuis la base de données.
+    """
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def invalidate_token_cache(user_id):
+    """
+    Supprime du cache tous les tokens d'un utilisateur (et ses réponses /api/me)
+
+    À appeler dès qu'un utilisateur est modifié ou supprimé, pour que les
+    requêtes suivantes relisent ses informations à jour en base de données.
+    """
+    with _token_cache_lock:
+        for cache in (_token_cache, _me_cache):
+            for key in [key for key, entry in cache.items() if entry[1] == user_id]:
+                del cache[key]
+
+
+# === POOL DE HACHAGE DES MOTS DE PASSE ===
+
+# Hacher ou vérifier un mot de passe est volontairement lent (calcul CPU de plusieurs dizaines de ms).
+# Ces calculs passent par un pool de threads de taille bornée (PASSWORD_HASH_WORKERS, voir config.py):
+# - Le calcul libère le GIL, les autres threads du worker continuent à servir des requêtes
+# - Un afflux de connexions ne lance jamais plus de PASSWORD_HASH_WORKERS hachages simultanés
+#   par processus. La limite est par processus: pour toute la machine, c'est
+#   workers gunicorn × PASSWORD_HASH_WORKERS (réglé pour ne pas dépasser le nombre de cœurs)
+# Sous gunicorn -k gevent, le module threading est remplacé par des greenlets (monkey patching):
+# un ThreadPoolExecutor classique bloquerait alors tout le processus pendant le hachage.
+# gevent fournit un ThreadPoolExecutor équivalent qui utilise de vrais threads système.
+_hash_executor_class = ThreadPoolExecutor
+try:
+    from gevent import monkey
+    if monkey.is_module_patched('threading'):
+        from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+        _hash_executor_class = GeventThreadPoolExecutor
+except ImportError:
+    pass  # gevent n'est pas installé: on garde le ThreadPoolExecutor standard
+
+_hash_executor = _hash_executor_class(max_workers=app.config['PASSWORD_HASH_WORKERS'],
+                                      thread_name_prefix='password-hash')
+
+# Coût du hachage Argon2 (voir config.py)
+configure_password_hasher(app.config['ARGON2_TIME_COST'], app.config['ARGON2_MEMORY_COST'],
+                          app.config['ARGON2_PARALLELISM'], salt_len=app.config['ARGON2_SALT_LEN'],
+                          hash_len=app.config['ARGON2_HASH_LEN'])
+
+
+def run_password_hash(method, password):
+    """
+    Exécute user.set_password / user.check_password dans le pool de hachage
+
+    Paramètres:
+        method: Méthode liée à appeler, ex: user.check_password
+        password (str): Mot de passe en clair
+
+    Retour:
+        Le résultat de la méthode (ex: True/False pour check_password)
+    """
+    return _hash_executor.submit(method, password).result()
+
+
+# === CACHE DU NOMBRE DE POSTS ===
+
+# Le COUNT(*) sur toute la table est coûteux et ne sert qu'à afficher le nombre de pages:
+# on le garde en mémoire quelques secondes (POST_COUNT_CACHE_TTL)
+_post_count_cache = TTLCache(maxsize=1, ttl=app.config['POST_COUNT_CACHE_TTL'])
+_post_count_lock = threading.Lock()
+
+
+def count_posts():
+    """
+    Retourne le nombre total de posts, mis en cache pendant POST_COUNT_CACHE_TTL secondes
+    """
+    with _post_count_lock:
+        total = _post_count_cache.get('posts')
+    if total is None:
+        total = Post.query.count()
+        with _post_count_lock:
+            _post_count_cache['posts'] = total
+    return total
+
+
+def invalidate_post_count():
+    """
+    Vide le cache du nombre de posts (à appeler après une création ou suppression de post)
+    """
+    with _post_count_lock:
+        _post_count_cache.clear()
+
+
+# === CACHE DES RÉPONSES PUBLIQUES ===
+
+# Cache des réponses JSON des routes publiques en lecture: (chemin, paramètres d'URL) → octets
+# Ces réponses sont les mêmes pour tous les visiteurs: on les sert depuis la mémoire
+# pendant RESPONSE_CACHE_TTL secondes au plus.
+_response_cache = TTLCache(maxsize=app.config['RESPONSE_CACHE_SIZE'], ttl=app.config['RESPONSE_CACHE_TTL'])
+_response_cache_lock = threading.Lock()
+# Numéro de version des données: incrémenté à chaque écriture en base
+# Une réponse calculée pendant une écriture concurrente n'est pas mise en cache
+_response_cache_version = 0
+
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_response_cache(session):
+    """
+    Vide le cache des réponses après chaque commit
+
+    Branché sur l'événement 'after_commit' de SQLAlchemy: toute écriture
+    (post, commentaire, like, utilisateur...) invalide les réponses en cache.
+    Les routes en lecture ne font jamais de commit.
+    """
+    global _response_cache_version
+    with _response_cache_lock:
+        _response_cache_version += 1
+        _response_cache.clear()
+
+
+def cached_response(f):
+    """
+    Décorateur qui met en cache la réponse JSON d'une route publique
+    =================================================================
+
+    Utilisation:
+        @app.route('/api/posts', methods=['GET'])
+        @cached_response
+        def get_posts():
+            ...
+
+    Fonctionnement:
+    1. Cherche la réponse dans le cache (clé = chemin + paramètres d'URL)
+    2. Si trouvée, renvoie directement les octets JSON, sans aucune requête SQL
+    3. Sinon, appelle la route et garde le corps de la réponse si le statut est 200
+
+    Réservé aux routes dont la réponse ne dépend pas de l'utilisateur connecté.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = (request.path, request.query_string)
+        with _response_cache_lock:
+            body = _response_cache.get(key)
+            version = _response_cache_version
+        if body is not None:
+            return app.response_class(body, mimetype='application/json')
+
+        response = app.make_response(f(*args, **kwargs))
+
+        # On ne garde que les succès, et seulement si aucune écriture n'a eu lieu entre-temps
+        if response.status_code == 200:
+            if response.is_streamed:
+                # Réponse envoyée en morceaux (ex: get_comments): le corps est mis en cache
+                # au fil de l'envoi, sans attendre ni bloquer le flux
+                response.response = _cache_streamed_body(response.response, key, version)
+            else:
+                with _response_cache_lock:
+                    if version == _response_cache_version:
+                        _response_cache[key] = response.get_data()
+        return response
+    return decorated
+
+
+def _cache_streamed_body(chunks, key, version):
+    """
+    Transmet les morceaux d'une réponse streamée tout en gardant une copie pour le cache
+
+    Le corps n'est mis en cache qu'à la fin de l'envoi, et seulement s'il ne dépasse pas
+    RESPONSE_CACHE_MAX_BODY octets: au-delà, on arrête la copie (la mémoire reste bornée).
+    """
+    parts = []
+    size = 0
+    try:
+        for chunk in chunks:
+            if parts is not None:
+                size += len(chunk)
+                if size > app.config['RESPONSE_CACHE_MAX_BODY']:
+                    parts = None  # Trop gros pour le cache: on continue d'envoyer sans copier
+                else:
+                    parts.append(chunk)
+            yield chunk
+    finally:
+        # Ferme le générateur d'origine même si le client se déconnecte en cours de route
+        # (stream_with_context libère alors le contexte de la requête)
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+    if parts is not None:
+        with _response_cache_lock:
+            if version == _response_cache_version:
+                _response_cache[key] = b''.join(parts)
+
+
+# === CHARGEMENT DES POSTS AVEC STATISTIQUES ===
+
+# Options utilisées partout où un post est sérialisé avec to_dict(include_author=True, include_stats=True)
+# Sans elles, chaque post déclenche une requête SQL supplémentaire pour son auteur:
+# c'est le problème "N+1" (1 requête pour la liste + N requêtes par post).
+# - selectinload: Charge les auteurs de TOUS les posts en une seule requête "WHERE id IN (...)"
+#   load_only: Seules les colonnes affichées (id, username) sont lues: les objets User gardés
+#   en mémoire pendant la requête sont plus petits (ni email, ni hash du mot de passe)
+# - undefer: Le contenu (colonne différée, voir models.py) est lu dans le même SELECT que le post
+# - raiseload('*'): Toute autre relation accédée par erreur lève une exception au lieu d'une requête cachée
+# configure_mappers() crée les attributs des backref (ex: Post.author) avant qu'on les utilise ici
+configure_mappers()
+POST_LOAD_OPTIONS = (
+    selectinload(Post.author).load_only(User.id, User.username),
+    undefer(Post.content),
+    raiseload('*'),
+)
+
+# Nombre de commentaires et de likes d'un post, calculés par la base de données
+# Ce sont les sous-requêtes corrélées des colonnes calculées Post.comments_count et
+# Post.likes_count (voir models.py), ajoutées comme colonnes au SELECT des posts.
+# On obtient directement deux entiers au lieu de charger tous les commentaires et likes.
+POST_COMMENTS_COUNT = Post.comments_count.expression.label('comments_count')
+POST_LIKES_COUNT = Post.likes_count.expression.label('likes_count')
+
+
+def query_posts_with_stats():
+    """
+    Requête sur les posts qui retourne des lignes (post, comments_count, likes_count)
+
+    Les auteurs sont chargés en lot (POST_LOAD_OPTIONS) et les compteurs calculés
+    en SQL: une page de posts coûte le même nombre de requêtes quelle que soit sa taille.
+    """
+    return Post.query.add_columns(POST_COMMENTS_COUNT, POST_LIKES_COUNT).options(*POST_LOAD_OPTIONS)
+
+
+def post_row_to_dict(row):
+    """
+    Convertit une ligne de query_posts_with_stats() en dictionnaire JSON
+    """
+    post, comments_count, likes_count = row
+    return post.to_dict(include_author=True, include_stats=True,
+                        likes_count=likes_count, comments_count=comments_count)
+
+
+# === CHARGEMENT DES COMMENTAIRES ===
+
+# Liste des commentaires d'un post en une seule requête, sans créer d'objets Comment:
+# on sélectionne uniquement les colonnes utiles, le nom de l'auteur (jointure sur users)
+# et le nombre de likes (sous-requête corrélée de Comment.likes_count, voir models.py)
+COMMENT_LIKES_COUNT = Comment.likes_count.expression
+COMMENTS_WITH_STATS = (select(Comment.id, Comment.content, Comment.user_id, Comment.post_id,
+                              Comment.created_at, Comment.updated_at, User.username, COMMENT_LIKES_COUNT)
+                       .join(User, Comment.user_id == User.id))
+
+
+def comment_row_to_dict(row):
+    """
+    Convertit une ligne de COMMENTS_WITH_STATS en dictionnaire JSON
+
+    Produit exactement le même format que Comment.to_dict(include_author=True, include_stats=True)
+    """
+    comment_id, content, user_id, post_id, created_at, updated_at, username, likes_count = row
+    return {
+        'id': comment_id,
+        'content': content,
+        'user_id': user_id,
+        'post_id': post_id,
+        'created_at': created_at,  # Objets datetime: orjson les écrit en texte ISO 8601
+        'updated_at': updated_at,
+        'author': {
+            'id': user_id,
+            'username': username
+        },
+        'likes_count': likes_count
+    }
+
+
+# === CHARGEMENT DES LIKES ===
+
+class iso_datetime(FunctionElement):
+    """
+    Expression SQL qui formate une colonne date en texte ISO 8601 ("2024-01-31T12:00:00.123456")
+
+    La date arrive déjà sous forme de texte: SQLAlchemy n'a plus à la convertir
+    en objet datetime, ni Python à la reconvertir en texte pour le JSON.
+    Même format que datetime.isoformat() (utilisé par les to_dict des autres routes):
+    microsecondes, et pas de partie décimale quand elles valent 0 ("2024-01-31T12:00:00").
+    Le SQL généré dépend de la base de données (voir les fonctions @compiles ci-dessous).
+    """
+    type = String()
+    inherit_cache = True
+
+
+@compiles(iso_datetime)
+def _iso_datetime_sqlite(element, compiler, **kw):
+    # SQLite (et par défaut): la date est stockée en texte "2024-01-31 12:00:00.123456",
+    # il suffit de remplacer l'espace par T (et d'enlever ".000000")
+    column = compiler.process(element.clauses, **kw)
+    return ("CASE WHEN substr({0}, 20) IN ('', '.000000') THEN replace(substr({0}, 1, 19), ' ', 'T') "
+            "ELSE replace({0}, ' ', 'T') END").format(column)
+
+
+@compiles(iso_datetime, 'postgresql')
+def _iso_datetime_postgresql(element, compiler, **kw):
+    # PostgreSQL: to_char, US = microsecondes (ajoutées seulement si la date n'est pas ronde)
+    column = compiler.process(element.clauses, **kw)
+    return ("(to_char({0}, 'YYYY-MM-DD\"T\"HH24:MI:SS') || "
+            "CASE WHEN date_trunc('second', {0}) = {0} THEN '' ELSE to_char({0}, '.US') END)").format(column)
+
+
+# Liste "qui a aimé": une seule requête qui retourne directement des tuples
+# (date déjà formatée, id et nom de l'utilisateur), sans créer d'objets PostLike/CommentLike ni User
+POST_LIKES_WITH_USERS = (select(iso_datetime(PostLike.created_at), User.id, User.username)
+                         .join(User, PostLike.user_id == User.id))
+COMMENT_LIKES_WITH_USERS = (select(iso_datetime(CommentLike.created_at), User.id, User.username)
+                            .join(User, CommentLike.user_id == User.id))
+
+
+def likes_payload(rows):
+    """
+    Construit la réponse JSON {'likes': [...], 'total': n} à partir des lignes de
+    POST_LIKES_WITH_USERS ou COMMENT_LIKES_WITH_USERS
+
+    Les dates sont déjà du texte ISO 8601 (formatées par la base, voir iso_datetime):
+    la boucle ne fait qu'assembler des dictionnaires.
+    """
+    likes = [{
+        'user': {
+            'id': user_id,
+            'username': username
+        },
+        'created_at': created_at
+    } for created_at, user_id, username in rows]
+    return {'likes': likes, 'total': len(likes)}
+
+
+# === RECHERCHE DES POSTS ===
+
+# Requête SQL de la recherche plein texte (SQLite), construite une seule fois au démarrage
+# comme les autres requêtes constantes de ce fichier (COMMENTS_WITH_STATS...)
+# ORDER BY rank: Les posts les plus pertinents en premier
+# LIMIT 50: Ne retourne que les 50 premiers résultats (évite surcharge)
+SEARCH_FTS_IDS = db.text('SELECT rowid FROM posts_fts WHERE posts_fts MATCH :match ORDER BY rank LIMIT 50')
+
+
+@lru_cache(maxsize=512)
+def search_post_ids(version, query):
+    """
+    Retourne les IDs des posts correspondant à une recherche (50 au maximum)
+
+    Paramètres:
+        version (tuple): Version des données (voir search_posts), fait partie de la clé du cache
+        query (str): Terme de recherche, déjà mis en minuscules
+
+    Retour:
+        tuple: IDs des posts, du plus pertinent au moins pertinent
+
+    Cache: Les recherches fréquentes ("python", "react"...) ne retournent pas en base.
+    La version fait partie de la clé du cache: après une écriture, les anciennes
+    entrées ne sont plus jamais demandées et finissent évincées (lru_cache).
+    """
+    if db.engine.dialect.name == 'sqlite':
+        # Recherche dans l'index plein texte posts_fts (voir create_post_search_index dans models.py)
+        # L'index donne directement les posts qui contiennent les mots, sans parcourir toute la table
+        # Chaque mot est mis entre guillemets (les caractères spéciaux de FTS5 sont ignorés)
+        # et suivi de * pour une recherche par préfixe (ex: "react" trouve "React.js" et "réaction")
+        match = ' '.join('"{}"*'.format(word.replace('"', '""')) for word in query.split())
+        if not match:
+            return ()  # Aucun mot: FTS5 refuse une expression vide ("syntax error")
+
+        return tuple(db.session.scalars(SEARCH_FTS_IDS, {'match': match}))
+
+    # Autres bases de données: recherche par motif
+    # f'%{query}%' signifie: Chercher le mot n'importe où dans le texte
+    # Ex: query="python" → pattern="%python%"
+    search_pattern = f'%{query}%'
+
+    # db.or_(): Opérateur OU (cherche dans title OU content)
+    # .ilike(): Recherche insensible à la casse (i = insensitive)
+    # Seuls les IDs sont sélectionnés: les posts sont chargés ensuite par la route
+    return tuple(db.session.scalars(
+        select(Post.id).where(
+            db.or_(
+                Post.title.ilike(search_pattern),    # Cherche dans le titre
+                Post.content.ilike(search_pattern)   # OU dans le contenu
+            )
+        ).order_by(Post.created_at.desc(), Post.id.desc()).limit(50)
+    ))
+
+
+# === ERREURS DE LA BASE DE DONNÉES ===
+
+def is_foreign_key_error(error):
+    """
+    Indique si une IntegrityError vient d'une clé étrangère (ex: post_id qui n'existe pas)
+
+    Les routes qui créent un commentaire ou un like ne vérifient pas d'abord que
+    le post existe: la base refuse l'insertion, et l'erreur est transformée en 404.
+    Messages reconnus: "FOREIGN KEY constraint failed" (SQLite),
+    "violates foreign key constraint" (PostgreSQL).
+    """
+    return 'foreign key' in str(error.orig).lower()
+
+
+# insert() de chaque base qui sait ignorer un doublon avec "ON CONFLICT DO NOTHING"
+INSERT_WITH_ON_CONFLICT = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def insert_ignoring_duplicates(model):
+    """
+    INSERT qui ne fait rien si la ligne existe déjà (même clé primaire ou valeur unique)
+
+    Paramètre:
+        model: Modèle dans lequel insérer (ex: PostLike), compléter avec .values(...)
+
+    Retour:
+        Insert: "INSERT ... ON CONFLICT DO NOTHING" sur SQLite et PostgreSQL,
+                INSERT simple sur les autres bases
+
+    Utilisé par les likes: deux clics simultanés sur "J'aime" tentent d'insérer le même
+    like, le second est simplement ignoré au lieu de provoquer une erreur 500.
+    Seuls les doublons sont ignorés: une clé étrangère invalide (post inexistant)
+    est toujours refusée par la base (voir is_foreign_key_error).
+    """
+    dialect_insert = INSERT_WITH_ON_CONFLICT.get(db.engine.dialect.name)
+    if dialect_insert is None:
+        return insert(model)
+    return dialect_insert(model).on_conflict_do_nothing()
+
+
+# === VALIDATION DES DONNÉES REÇUES ===
+
+def make_parser(*fields):
+    """
+    Génère une fonction qui vérifie et extrait des champs obligatoires d'un JSON
+    ============================================================================
+
+    Paramètres:
+        *fields (str): Noms des champs obligatoires, ex: make_parser('title', 'content')
+
+    Retour:
+        function: parse(data) qui retourne le tuple des valeurs dans l'ordre demandé,
+                  ou None si data est vide ou si un champ est absent/vide
+
+    Le code de la fonction est généré une seule fois au démarrage puis compilé par Python.
+    Pour make_parser('title', 'content'), on obtient exactement:
+
+        def parse(data):
+            if not data:
+                return None
+            v_title = data.get('title')
+            if not v_title:
+                return None
+            v_content = data.get('content')
+            if not v_content:
+                return None
+            return (v_title, v_content, )
+
+    À chaque requête, il n'y a plus qu'une suite de tests simples, sans boucle ni liste de champs.
+    """
+    # Les noms de champs deviennent des noms de variables dans le code généré: on les vérifie
+    for field in fields:
+        if not field.isidentifier():
+            raise ValueError(f'Nom de champ invalide: {field!r}')
+
+    lines = ['def parse(data):', '    if not data:', '        return None']
+    for field in fields:
+        lines.append(f'    v_{field} = data.get({field!r})')
+        lines.append(f'    if not v_{field}:')
+        lines.append('        return None')
+    lines.append('    return (' + ''.join(f'v_{field}, ' for field in fields) + ')')
+
+    # exec() compile le code source et place la fonction 'parse' dans namespace
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    return namespace['parse']
+
+
+# Un parseur par forme de requête, générés une fois pour toutes
+parse_register = make_parser('username', 'email', 'password')
+parse_login = make_parser('username', 'password')
+parse_post = make_parser('title', 'content')
+parse_comment = make_parser('content')
+parse_password_change = make_parser('current_password', 'new_password')
+
+
+# === VÉRIFICATION D'UNICITÉ ===
+
+def find_identity_conflict(username, email, user_id):
+    """
+    Cherche si un username ou un email est déjà utilisé par un AUTRE utilisateur
+
+    Paramètres:
+        username (str | None): Nouveau username (None = pas de changement)
+        email (str | None): Nouvel email (None = pas de changement)
+        user_id (int): ID de l'utilisateur modifié (il peut garder ses propres valeurs)
+
+    Retour:
+        str | None: Message d'erreur à renvoyer avec un 409, ou None si tout est libre
+
+    Une seule requête "WHERE username = :u OR email = :e" remplace les deux
+    vérifications séparées: on regarde ensuite quelle colonne correspond.
+    """
+    conditions = []
+    if username is not None:
+        conditions.append(User.username == username)
+    if email is not None:
+        conditions.append(User.email == email)
+    if not conditions:
+        return None
+
+    # On ne récupère que les colonnes utiles, pas l'objet User complet
+    rows = [row for row in db.session.query(User.id, User.username, User.email).filter(or_(*conditions))
+            if row.id != user_id]
+
+    # Même priorité qu'avant: le username est vérifié avant l'email
+    # Les colonnes sont insensibles à la casse (voir models.py): on compare de la même façon
+    if username is not None and any(row.username.lower() == username.lower() for row in rows):
+        return 'Nom d\'utilisateur déjà existant'
+    if email is not None and any(row.email.lower() == email.lower() for row in rows):
+        return 'Email déjà existant'
+    return None
+
+
 # === DECORATEURS DE SÉCURITÉ ===
 
 def token_required(f):
@@ -77,6 +827,10 @@ def token_required(f):
             # current_user est automatiquement fourni par le décorateur
             return jsonify({'message': f'Hello {current_user.username}'})
 
+    Cache:
+    Les tokens déjà vérifiés sont gardés quelques secondes en mémoire (TOKEN_CACHE_TTL),
+    ce qui évite de refaire la vérification de signature et la requête SQL à chaque appel.
+
     Codes d'erreur possibles:
     - 401: Token manquant, expiré ou invalide
     """
@@ -84,39 +838,57 @@ def token_required(f):
     def decorated(*args, **kwargs):
         # Récupération du token depuis l'en-tête Authorization
         # Format attendu: "Authorization: Bearer <token>"
-        token = request.headers.get('Authorization')
+        # partition(' ') découpe en une seule passe: "Bearer abc123" -> ("Bearer", " ", "abc123")
+        # (en-tête absent -> chaîne vide -> scheme et token vides)
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
 
-        # Vérification 1: Le token est-il présent?
-        if not token:
-            return jsonify({'message': 'Token manquant'}), 401
+        # Vérification 1: Le token est-il présent (et bien précédé de "Bearer")?
+        if scheme != 'Bearer' or not token:
+            return ERR_TOKEN_MISSING()
 
         try:
-            # Nettoyage du token: suppression du préfixe "Bearer " si présent
-            # Ex: "Bearer abc123" devient "abc123"
-            if token.startswith('Bearer '):
-                token = token[7:]  # Enlève les 7 premiers caractères ("Bearer ")
+            # Recherche du token dans le cache (clé = empreinte SHA-256 du token)
+            # La clé est aussi gardée dans g pour les routes qui ont leur propre cache (ex: /api/me)
+            key = g.token_key = hashlib.sha256(token.encode()).digest()
+            with _token_cache_lock:
+                entry = _token_cache.get(key)
+
+            # Cache valide: on saute la vérification JWT et la requête SQL
+            # (on revérifie quand même l'expiration propre du token)
+            if entry and entry[0] > time.time():
+                g.token_exp = entry[0]
+                g.jwt_claims = entry[3]
+                return f(_cached_user(entry[2]), *args, **kwargs)
 
             # Décodage du token JWT avec la clé secrète
-            # jwt.decode() vérifie automatiquement:
+            # decode_jwt() (jwt.decode avec notre clé) vérifie automatiquement:
             # - La signature (le token n'a pas été modifié)
             # - L'expiration (le token n'est pas expiré)
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+            data = decode_jwt(token)
 
             # Récupération de l'utilisateur depuis la base de données
             # data['user_id'] contient l'ID de l'utilisateur qui était dans le token
-            current_user = User.query.get(data['user_id'])
+            current_user = db.session.get(User, data['user_id'])
 
             # Vérification 2: L'utilisateur existe-t-il encore?
             # (Il pourrait avoir été supprimé après la création du token)
             if not current_user:
-                return jsonify({'message': 'Utilisateur non trouvé'}), 401
+                return ERR_TOKEN_USER()
+
+            # Mise en cache du résultat (seulement si tout s'est bien passé)
+            snapshot = {column.key: getattr(current_user, column.key) for column in User.__table__.columns}
+            with _token_cache_lock:
+                _token_cache[key] = (data['exp'], current_user.id, snapshot, data)
+            g.token_exp = data['exp']
+            # Claims du token disponibles pour les décorateurs suivants (ex: @admin_required)
+            g.jwt_claims = data
 
         except jwt.ExpiredSignatureError:
             # Le token a expiré (plus de 24h dans notre config)
-            return jsonify({'message': 'Token expiré'}), 401
+            return ERR_TOKEN_EXPIRED()
         except jwt.InvalidTokenError:
             # Le token est invalide (mauvaise signature, format incorrect, etc.)
-            return jsonify({'message': 'Token invalide'}), 401
+            return ERR_TOKEN_INVALID()
 
         # Si tout est OK, on appelle la fonction originale en lui passant current_user
         # current_user devient le premier paramètre de la fonction décorée
@@ -139,8 +911,13 @@ def admin_required(f):
 
     Fonctionnement:
     1. Suppose que current_user est déjà fourni par @token_required
-    2. Vérifie que current_user.is_admin est True
-    3. Si oui, appelle la fonction, sinon retourne 403 Forbidden
+    2. Lit le claim 'adm' du token (rangé dans g.jwt_claims par @token_required):
+       un token émis pour un non-admin est refusé sans regarder l'utilisateur
+    3. Vérifie que current_user.is_admin est toujours True
+       (un admin rétrogradé perd l'accès sans attendre l'expiration de son token)
+    4. Si oui, appelle la fonction, sinon retourne 403 Forbidden
+
+    Note: Un utilisateur promu admin doit se reconnecter pour obtenir un token avec 'adm'
 
     Code d'erreur:
     - 403: L'utilisateur est connecté mais n'est pas admin
@@ -148,9 +925,10 @@ def admin_required(f):
     @wraps(f)
     def decorated(current_user, *args, **kwargs):
         # Vérification: L'utilisateur a-t-il les droits admin?
-        if not current_user.is_admin:
+        # .get('adm', True): Les tokens émis avant l'ajout du claim sont vérifiés sur l'utilisateur seul
+        if not g.jwt_claims.get('adm', True) or not current_user.is_admin:
             # 403 Forbidden: L'utilisateur est authentifié mais n'a pas les droits
-            return jsonify({'message': 'Accès refusé - droits administrateur requis'}), 403
+            return ERR_ADMIN()
 
         # Si l'utilisateur est admin, on appelle la fonction normalement
         return f(current_user, *args, **kwargs)
@@ -187,62 +965,65 @@ def register():
     Processus:
     1. Récupère les données JSON envoyées par le frontend
     2. Vérifie que tous les champs obligatoires sont présents
-    3. Vérifie que username et email sont uniques
-    4. Crée l'utilisateur avec mot de passe hashé
-    5. Sauvegarde dans la base de données
-    6. Retourne les infos de l'utilisateur créé
+    3. Crée l'utilisateur avec mot de passe hashé
+    4. Sauvegarde dans la base de données (les contraintes UNIQUE refusent les doublons)
+    5. Retourne les infos de l'utilisateur créé
     """
     # Récupération des données JSON envoyées dans le corps de la requête
     data = request.get_json()
 
     # Validation: Vérifier que toutes les données obligatoires sont présentes
-    # 'not data' vérifie si data est None ou vide
-    # Les autres conditions vérifient les champs spécifiques
-    if not data or not data.get('username') or not data.get('email') or not data.get('password'):
+    # parse_register() retourne None si data est vide ou si un champ manque (voir make_parser)
+    fields = parse_register(data)
+    if fields is None:
         # 400 Bad Request: La requête est mal formée
-        return jsonify({'message': 'Données incomplètes'}), 400
-
-    # Vérification 1: Le username est-il déjà utilisé?
-    # User.query.filter_by() cherche dans la base de données
-    # .first() retourne le premier résultat ou None
-    if User.query.filter_by(username=data['username']).first():
-        # 409 Conflict: Le username existe déjà
-        return jsonify({'message': 'Nom d\'utilisateur déjà existant'}), 409
-
-    # Vérification 2: L'email est-il déjà utilisé?
-    if User.query.filter_by(email=data['email']).first():
-        # 409 Conflict: L'email existe déjà
-        return jsonify({'message': 'Email déjà existant'}), 409
+        return ERR_INCOMPLETE()
+    username, email, password = fields
 
-    # Création du nouvel utilisateur
-    # On crée une instance de la classe User (définie dans models.py)
-    user = User(
-        username=data['username'],
-        email=data['email'],
+    # Hashage du mot de passe de manière sécurisée
+    # hash_password() est définie dans models.py (même calcul que User.set_password)
+    # Elle utilise generate_password_hash() pour sécuriser le mot de passe
+    # Le calcul du hash passe par le pool de hachage (voir run_password_hash)
+    password_hash = run_password_hash(hash_password, password)
+
+    # Création du nouvel utilisateur avec INSERT ... RETURNING
+    # La base renvoie la ligne insérée (id, created_at, ...) dans la même requête:
+    # pas de SELECT supplémentaire pour relire l'utilisateur avant de répondre
+    stmt = insert(User).values(
+        username=username,
+        email=email,
+        password_hash=password_hash,
         # is_admin: Utilise la valeur fournie ou False par défaut
         # data.get('is_admin', False) retourne False si 'is_admin' n'est pas dans data
         is_admin=data.get('is_admin', False)
-    )
-
-    # Hashage et enregistrement du mot de passe de manière sécurisée
-    # set_password() est une méthode définie dans User (models.py)
-    # Elle utilise generate_password_hash() pour sécuriser le mot de passe
-    user.set_password(data['password'])
-
-    # Ajout de l'utilisateur à la session de base de données
-    # À ce stade, l'utilisateur est en mémoire mais pas encore dans la DB
-    db.session.add(user)
-
-    # Commit: Sauvegarde définitive dans la base de données
-    # C'est seulement à ce moment que l'utilisateur est vraiment créé
-    # Un ID unique lui est automatiquement attribué
-    db.session.commit()
+    ).returning(User)
+
+    # Unicité: Pas de SELECT préalable sur username/email, ce sont les contraintes UNIQUE
+    # de la table qui refusent les doublons (une seule requête quand tout va bien)
+    try:
+        user = db.session.execute(stmt).scalar_one()
+        # Sérialisation AVANT le commit: après commit(), SQLAlchemy "expire" les objets
+        # et relirait l'utilisateur en base au premier accès à un attribut
+        user_data = user.to_dict()
+
+        # Commit: Sauvegarde définitive dans la base de données
+        # C'est seulement à ce moment que l'utilisateur est vraiment créé
+        db.session.commit()
+    except IntegrityError as e:
+        # Annulation de la transaction échouée avant de répondre
+        db.session.rollback()
+        # Le message d'erreur de la base nomme la colonne en cause
+        # Ex (SQLite): "UNIQUE constraint failed: users.username"
+        # 409 Conflict: Le username ou l'email existe déjà
+        if 'username' in str(e.orig):
+            return jsonify({'message': 'Nom d\'utilisateur déjà existant'}), 409
+        return jsonify({'message': 'Email déjà existant'}), 409
 
     # Réponse de succès avec les données de l'utilisateur créé
     # 201 Created: La ressource a été créée avec succès
     return jsonify({
         'message': 'Utilisateur créé avec succès',
-        'user': user.to_dict()  # Convertit l'objet User en dictionnaire JSON
+        'user': user_data
     }), 201
 
 
@@ -278,30 +1059,39 @@ def login():
     data = request.get_json()
 
     # Validation des données
-    if not data or not data.get('username') or not data.get('password'):
-        return jsonify({'message': 'Données incomplètes'}), 400
+    fields = parse_login(data)
+    if fields is None:
+        return ERR_INCOMPLETE()
+    username, password = fields
 
     # Recherche de l'utilisateur dans la base de données par username
-    user = User.query.filter_by(username=data['username']).first()
+    user = User.query.filter_by(username=username).first()
 
     # Vérification des identifiants:
     # 1. L'utilisateur existe-t-il? (user est None si non trouvé)
     # 2. Le mot de passe est-il correct? (check_password compare avec le hash)
-    if not user or not user.check_password(data['password']):
+    #    (vérification exécutée dans le pool de hachage, voir run_password_hash)
+    if not user or not run_password_hash(user.check_password, password):
         # 401 Unauthorized: Identifiants incorrects
         # Note: On ne dit pas si c'est le username ou le password qui est faux (sécurité)
-        return jsonify({'message': 'Identifiants incorrects'}), 401
+        return ERR_BAD_CREDENTIALS()
+
+    # Hash ancien recalculé par check_password (voir models.py): on l'enregistre
+    if db.session.is_modified(user):
+        db.session.commit()
 
     # Création du token JWT (JSON Web Token)
     # Un JWT contient:
     # - Un payload (données encodées): ici user_id et expiration
     # - Une signature (pour vérifier qu'il n'a pas été modifié)
-    token = jwt.encode({
+    # encode_jwt() signe en HS256 avec la clé secrète préparée au démarrage
+    token = encode_jwt({
         'user_id': user.id,  # ID de l'utilisateur (pour savoir qui est connecté)
+        'adm': user.is_admin,  # Droits admin au moment de la connexion (lu par @admin_required)
         # Date d'expiration = maintenant + 24 heures (défini dans config.py)
-        'exp': datetime.utcnow() + app.config['JWT_EXPIRATION_DELTA']
-    }, app.config['SECRET_KEY'],  # Clé secrète pour signer le token
-       algorithm='HS256')  # Algorithme de hashage utilisé
+        # Le standard JWT exprime les dates en secondes depuis le 01/01/1970 (UTC)
+        'exp': int(time.time()) + JWT_TTL_SECONDS
+    })
 
     # Réponse de succès avec le token et les infos utilisateur
     # Le frontend va stocker ce token et l'envoyer dans toutes les futures requêtes
@@ -332,10 +1122,24 @@ def get_current_user(current_user):
     - Vérifier que le token est toujours valide
     - Récupérer les infos à jour de l'utilisateur connecté
     - Utilisé au chargement de l'application pour restaurer la session
+
+    Cache: La réponse est gardée en mémoire par token (ME_CACHE_TTL secondes au plus)
+    et effacée dès que l'utilisateur est modifié (voir invalidate_token_cache)
     """
+    # Réponse déjà encodée pour ce token? On renvoie directement les octets
+    with _token_cache_lock:
+        entry = _me_cache.get(g.token_key)
+    if entry and entry[0] > time.time():
+        return app.response_class(entry[2], mimetype='application/json'), 200
+
     # current_user est fourni automatiquement par le décorateur @token_required
     # Pas besoin de le chercher dans la DB, c'est déjà fait!
-    return jsonify({'user': current_user.to_dict()}), 200
+    response = jsonify({'user': current_user.to_dict()})
+
+    # Mise en cache du corps JSON, jusqu'à l'expiration du token au plus tard
+    with _token_cache_lock:
+        _me_cache[g.token_key] = (g.token_exp, current_user.id, response.get_data())
+    return response, 200
 
 
 # ========================================
@@ -398,6 +1202,7 @@ def delete_user(current_user, user_id):
     - 401/403: Problèmes d'authentification/autorisation
 
     Sécurité: Un admin ne peut pas supprimer son propre compte
+    Cascade: Ses posts, commentaires et likes sont aussi supprimés (un DELETE par table)
     """
     # Protection: Un admin ne peut pas se supprimer lui-même
     # Cela évite qu'il n'y ait plus d'admin du tout!
@@ -405,19 +1210,29 @@ def delete_user(current_user, user_id):
         return jsonify({'message': 'Vous ne pouvez pas supprimer votre propre compte'}), 400
 
     # Recherche de l'utilisateur à supprimer
-    # User.query.get() cherche par clé primaire (ID)
-    user = User.query.get(user_id)
+    # db.session.get() cherche par clé primaire (ID)
+    # Si l'objet est déjà chargé dans la session (identity map), aucune requête SQL n'est faite
+    user = db.session.get(User, user_id)
 
     # Vérification: L'utilisateur existe-t-il?
     if not user:
         return jsonify({'message': 'Utilisateur non trouvé'}), 404
 
-    # Suppression de l'utilisateur
-    # Grâce à cascade='all, delete-orphan' dans models.py,
-    # tous les posts, comments et likes de cet utilisateur seront aussi supprimés
-    db.session.delete(user)
+    # Suppression de l'utilisateur et de tout ce qui lui est rattaché
+    # Au lieu de db.session.delete(user), qui charge chaque post/commentaire/like en mémoire
+    # puis envoie un DELETE par ligne, un seul DELETE suffit: les clés étrangères sont
+    # déclarées ON DELETE CASCADE (voir models.py), la base supprime elle-même ses posts,
+    # ses commentaires, ses likes, ainsi que les commentaires et likes reçus par ses posts.
+    # synchronize_session=False: Inutile de mettre à jour les objets en mémoire, le commit les expire
+    db.session.execute(delete(User).where(User.id == user_id),
+                       execution_options={'synchronize_session': False})
     db.session.commit()  # Sauvegarde la suppression dans la DB
 
+    # Les tokens de cet utilisateur ne doivent plus être acceptés depuis le cache
+    invalidate_token_cache(user_id)
+    # Ses posts ont été supprimés avec lui
+    invalidate_post_count()
+
     return jsonify({'message': 'Utilisateur supprimé avec succès'}), 200
 
 
@@ -453,28 +1268,25 @@ def update_user(current_user, user_id):
     Sécurité: Un admin ne peut pas retirer ses propres droits admin
     """
     # Recherche de l'utilisateur à modifier
-    user = User.query.get(user_id)
+    user = db.session.get(User, user_id)
     if not user:
         return jsonify({'message': 'Utilisateur non trouvé'}), 404
 
     # Récupération des nouvelles données
     data = request.get_json()
 
+    # Vérifier que le nouveau username et le nouvel email ne sont pas déjà pris par quelqu'un d'autre
+    # (une seule requête pour les deux champs, voir find_identity_conflict)
+    conflict = find_identity_conflict(data.get('username'), data.get('email'), user_id)
+    if conflict:
+        return jsonify({'message': conflict}), 409
+
     # Modification du username si fourni
     if 'username' in data:
-        # Vérifier que le nouveau username n'est pas déjà pris par quelqu'un d'autre
-        existing = User.query.filter_by(username=data['username']).first()
-        # existing.id != user_id: On peut garder le même username qu'avant
-        if existing and existing.id != user_id:
-            return jsonify({'message': 'Nom d\'utilisateur déjà existant'}), 409
         user.username = data['username']
 
     # Modification de l'email si fourni
     if 'email' in data:
-        # Même vérification que pour username
-        existing = User.query.filter_by(email=data['email']).first()
-        if existing and existing.id != user_id:
-            return jsonify({'message': 'Email déjà existant'}), 409
         user.email = data['email']
 
     # Modification des droits admin si fourni
@@ -487,11 +1299,14 @@ def update_user(current_user, user_id):
 
     # Modification du mot de passe si fourni et non vide
     if 'password' in data and data['password']:
-        user.set_password(data['password'])  # Hash le nouveau mot de passe
+        run_password_hash(user.set_password, data['password'])  # Hash le nouveau mot de passe
 
     # Sauvegarde de toutes les modifications
     db.session.commit()
 
+    # Le cache des tokens contient peut-être l'ancienne version de cet utilisateur
+    invalidate_token_cache(user_id)
+
     return jsonify({
         'message': 'Utilisateur mis à jour avec succès',
         'user': user.to_dict()
@@ -503,6 +1318,7 @@ def update_user(current_user, user_id):
 # ========================================
 
 @app.route('/api/posts', methods=['GET'])
+@cached_response  # Réponse gardée en mémoire quelques secondes (voir cached_response)
 def get_posts():
     """
     Route publique - Liste tous les posts avec pagination
@@ -514,14 +1330,19 @@ def get_posts():
 
     Paramètres de requête (query params):
     - page: Numéro de la page (défaut: 1)
-    - per_page: Nombre de posts par page (défaut: 10)
+    - per_page: Nombre de posts par page (défaut: 10, entre 1 et 100)
+    - cursor: Curseur renvoyé par la page précédente (next_cursor), prioritaire sur page
 
     Réponse:
     - 200 OK: Liste des posts de la page demandée
+    - 400 Bad Request: Curseur invalide
 
     Exemple d'URL: /api/posts?page=2&per_page=20
     Cela retournera les posts 21 à 40
 
+    Exemple avec curseur: /api/posts?per_page=20&cursor=2024-01-15T10:30:00_42
+    Cela retournera les 20 posts qui suivent le post 42
+
     Utilité: Afficher le forum avec pagination pour ne pas tout charger d'un coup
     """
     # Récupération des paramètres de pagination depuis l'URL
@@ -531,36 +1352,69 @@ def get_posts():
     # - Convertit en type int (entier)
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
+    cursor = request.args.get('cursor')
 
-    # Construction de la requête de base
-    # Post.query.order_by(Post.created_at.desc()): Trie par date décroissante (plus récent en premier)
-    posts_query = Post.query.order_by(Post.created_at.desc())
-
-    # Calcul du nombre total de posts
-    # count() retourne le nombre total de posts dans la DB
-    total = posts_query.count()
+    # Valeurs ramenées dans des bornes raisonnables: au moins la page 1, entre 1 et 100 posts
+    # par page (per_page=0 ou négatif n'a pas de sens, et une valeur énorme chargerait toute la table)
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), 100)
 
-    # Application de la pagination
-    # .offset((page - 1) * per_page): Saute les posts des pages précédentes
-    #   Ex: page 2, per_page 10 → offset(10) → saute les 10 premiers
-    # .limit(per_page): Ne prend que 'per_page' posts
-    #   Ex: limit(10) → prend 10 posts maximum
-    posts = posts_query.offset((page - 1) * per_page).limit(per_page).all()
+    # Construction de la requête de base
+    # Tri par date décroissante (plus récent en premier), puis par id pour départager
+    # les posts créés au même instant: l'ordre doit être total pour que le curseur soit fiable
+    # query_posts_with_stats(): Auteurs chargés en lot et compteurs calculés en SQL (pas de N+1)
+    posts_query = query_posts_with_stats().order_by(Post.created_at.desc(), Post.id.desc())
+
+    if cursor:
+        # Pagination par curseur (keyset): on reprend juste après le dernier post de la page précédente
+        # La base saute directement à la bonne position via l'index, quelle que soit la profondeur
+        # (contrairement à offset() qui lit puis jette toutes les lignes des pages précédentes)
+        try:
+            cursor_date, _, cursor_id = cursor.rpartition('_')
+            cursor_key = (datetime.fromisoformat(cursor_date), int(cursor_id))
+        except ValueError:
+            return jsonify({'message': 'Curseur invalide'}), 400
+        posts_query = posts_query.filter(tuple_(Post.created_at, Post.id) < cursor_key)
+    else:
+        # Ancienne pagination par numéro de page (utilisée par le forum)
+        # .offset((page - 1) * per_page): Saute les posts des pages précédentes
+        #   Ex: page 2, per_page 10 → offset(10) → saute les 10 premiers
+        posts_query = posts_query.offset((page - 1) * per_page)
+
+    # .limit(per_page + 1): On demande un post de plus que nécessaire
+    # S'il existe, c'est qu'il reste une page après celle-ci
+    # Chaque ligne est un tuple (post, comments_count, likes_count)
+    rows = posts_query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    # Curseur à renvoyer pour demander la page suivante: "<date>_<id>" du dernier post affiché
+    # Sans date (ligne écrite avant la mise à jour du schéma, voir rebuild_outdated_tables),
+    # pas de curseur possible: le client continue avec la pagination par numéro de page
+    last_post = rows[-1][0] if rows else None
+    next_cursor = None
+    if has_more and last_post is not None and last_post.created_at is not None:
+        next_cursor = f'{last_post.created_at.isoformat()}_{last_post.id}'
+
+    # Nombre total de posts (mis en cache quelques secondes, voir count_posts)
+    total = count_posts()
 
     # Réponse avec les posts et les métadonnées de pagination
     return jsonify({
-        'posts': [post.to_dict(include_author=True, include_stats=True) for post in posts],
+        'posts': [post_row_to_dict(row) for row in rows],
         'total': total,  # Nombre total de posts
         'page': page,  # Page actuelle
         'per_page': per_page,  # Posts par page
         # Calcul du nombre total de pages
         # (total + per_page - 1) // per_page est une astuce pour arrondir vers le haut
         # Ex: 25 posts, 10 par page → (25+10-1)//10 = 3 pages
-        'total_pages': (total + per_page - 1) // per_page
+        'total_pages': (total + per_page - 1) // per_page,
+        'next_cursor': next_cursor  # None s'il n'y a plus de page après celle-ci
     }), 200
 
 
 @app.route('/api/posts/<int:post_id>', methods=['GET'])
+@cached_response
 def get_post(post_id):
     """
     Route publique - Récupère un post spécifique par son ID
@@ -579,15 +1433,15 @@ def get_post(post_id):
 
     Utilité: Afficher un post en détail avec ses commentaires
     """
-    # Recherche du post par ID
-    post = Post.query.get(post_id)
+    # Recherche du post par ID, avec son auteur et ses compteurs en une seule requête
+    row = query_posts_with_stats().filter(Post.id == post_id).first()
 
     # Vérification: Le post existe-t-il?
-    if not post:
+    if not row:
         return jsonify({'message': 'Post non trouvé'}), 404
 
     # Retourne le post avec toutes ses informations
-    return jsonify({'post': post.to_dict(include_author=True, include_stats=True)}), 200
+    return jsonify({'post': post_row_to_dict(row)}), 200
 
 
 @app.route('/api/posts', methods=['POST'])
@@ -622,25 +1476,33 @@ def create_post(current_user):
     data = request.get_json()
 
     # Validation: Titre et contenu obligatoires
-    if not data or not data.get('title') or not data.get('content'):
-        return jsonify({'message': 'Titre et contenu requis'}), 400
+    fields = parse_post(data)
+    if fields is None:
+        return ERR_POST_FIELDS()
+    title, content = fields
 
-    # Création du nouveau post
+    # Création du nouveau post avec INSERT ... RETURNING (la ligne insérée revient dans la même requête)
     # user_id = current_user.id lie automatiquement le post à l'auteur
-    post = Post(
-        title=data['title'],
-        content=data['content'],
-        user_id=current_user.id  # L'auteur est l'utilisateur connecté
-    )
+    post = db.session.execute(
+        insert(Post).values(
+            title=title,
+            content=content,
+            user_id=current_user.id  # L'auteur est l'utilisateur connecté
+        ).returning(Post).options(undefer(Post.content))  # Contenu (colonne différée) aussi renvoyé
+    ).scalar_one()
+
+    # Sérialisation avant le commit (voir register): l'auteur est l'utilisateur connecté
+    # et un post tout neuf n'a encore ni like ni commentaire, rien à relire en base
+    post_data = post.to_dict(author=current_user, likes_count=0, comments_count=0)
 
     # Sauvegarde dans la base de données
-    db.session.add(post)
     db.session.commit()
+    invalidate_post_count()
 
     # 201 Created: La ressource a été créée avec succès
     return jsonify({
         'message': 'Post créé avec succès',
-        'post': post.to_dict(include_author=True, include_stats=True)
+        'post': post_data
     }), 201
 
 
@@ -673,7 +1535,7 @@ def update_post(current_user, post_id):
     Sécurité: Seul l'auteur du post ou un admin peut le modifier
     """
     # Recherche du post à modifier
-    post = Post.query.get(post_id)
+    post = db.session.get(Post, post_id)
     if not post:
         return jsonify({'message': 'Post non trouvé'}), 404
 
@@ -694,11 +1556,8 @@ def update_post(current_user, post_id):
     if 'content' in data:
         post.content = data['content']
 
-    # Mise à jour de la date de modification
-    # updated_at s'actualise automatiquement grâce à onupdate dans models.py
-    # Mais on peut aussi le forcer manuellement
-    post.updated_at = datetime.utcnow()
-
+    # Pas besoin de toucher à updated_at: la date de modification est remplie
+    # automatiquement par onupdate (models.py) lors de l'UPDATE
     # Sauvegarde des modifications
     db.session.commit()
 
@@ -731,7 +1590,7 @@ def delete_post(current_user, post_id):
     Cascade: Tous les commentaires et likes du post sont aussi supprimés
     """
     # Recherche du post à supprimer
-    post = Post.query.get(post_id)
+    post = db.session.get(Post, post_id)
     if not post:
         return jsonify({'message': 'Post non trouvé'}), 404
 
@@ -739,10 +1598,12 @@ def delete_post(current_user, post_id):
     if post.user_id != current_user.id and not current_user.is_admin:
         return jsonify({'message': 'Accès refusé'}), 403
 
-    # Suppression du post
-    # Grâce à cascade dans models.py, les comments et likes sont aussi supprimés
-    db.session.delete(post)
+    # Suppression du post, de ses commentaires et de tous les likes associés
+    # Un seul DELETE: la base supprime le reste (ON DELETE CASCADE, voir delete_user)
+    db.session.execute(delete(Post).where(Post.id == post_id),
+                       execution_options={'synchronize_session': False})
     db.session.commit()
+    invalidate_post_count()
 
     return jsonify({'message': 'Post supprimé avec succès'}), 200
 
@@ -752,6 +1613,7 @@ def delete_post(current_user, post_id):
 # ========================================
 
 @app.route('/api/posts/<int:post_id>/comments', methods=['GET'])
+@cached_response
 def get_comments(post_id):
     """
     Route publique - Liste tous les commentaires d'un post
@@ -771,18 +1633,30 @@ def get_comments(post_id):
     Tri: Les commentaires sont triés par date croissante (plus ancien en premier)
     """
     # Vérification que le post existe
-    post = Post.query.get(post_id)
+    post = db.session.get(Post, post_id)
     if not post:
         return jsonify({'message': 'Post non trouvé'}), 404
 
-    # Récupération de tous les commentaires du post
-    # filter_by(post_id=post_id): Ne prend que les commentaires de ce post
+    # Récupération de tous les commentaires du post (auteurs et likes compris, en une requête)
+    # where(Comment.post_id == post_id): Ne prend que les commentaires de ce post
     # order_by(Comment.created_at.asc()): Trie par date croissante (ASC = ascending)
-    comments = Comment.query.filter_by(post_id=post_id).order_by(Comment.created_at.asc()).all()
+    # puis par id: les dates sont à la seconde près, l'id départage les commentaires de la même seconde
+    # yield_per(500): Les lignes sont lues par paquets de 500 au lieu d'être toutes chargées d'un coup
+    stmt = (COMMENTS_WITH_STATS.where(Comment.post_id == post_id)
+            .order_by(Comment.created_at.asc(), Comment.id.asc())
+            .execution_options(yield_per=500))
 
-    return jsonify({
-        'comments': [comment.to_dict(include_author=True, include_stats=True) for comment in comments]
-    }), 200
+    def generate():
+        # Réponse envoyée en morceaux: {"comments":[ puis chaque commentaire, puis ]}
+        # La mémoire utilisée reste celle d'un paquet de lignes, même pour des milliers de commentaires
+        yield b'{"comments":['
+        separator = b''
+        for row in db.session.execute(stmt):
+            yield separator + orjson.dumps(comment_row_to_dict(row))
+            separator = b','
+        yield b']}'
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/json')
 
 
 @app.route('/api/posts/<int:post_id>/comments', methods=['POST'])
@@ -809,30 +1683,40 @@ def create_comment(current_user, post_id):
     - 400 Bad Request: Contenu manquant
     - 404 Not Found: Post non trouvé
     """
-    # Vérification que le post existe
-    post = Post.query.get(post_id)
-    if not post:
-        return jsonify({'message': 'Post non trouvé'}), 404
-
     # Récupération du contenu du commentaire
     data = request.get_json()
-    if not data or not data.get('content'):
-        return jsonify({'message': 'Contenu requis'}), 400
-
-    # Création du commentaire
-    comment = Comment(
-        content=data['content'],
-        user_id=current_user.id,  # Auteur = utilisateur connecté
-        post_id=post_id  # Lié au post spécifié
-    )
+    fields = parse_comment(data)
+    if fields is None:
+        return ERR_CONTENT_REQUIRED()
+    content, = fields
+
+    # Création du commentaire avec INSERT ... RETURNING (la ligne insérée revient dans la même requête)
+    # Pas de SELECT préalable pour vérifier que le post existe: la clé étrangère post_id
+    # fait refuser l'insertion par la base, on répond alors 404
+    try:
+        comment = db.session.execute(
+            insert(Comment).values(
+                content=content,
+                user_id=current_user.id,  # Auteur = utilisateur connecté
+                post_id=post_id  # Lié au post spécifié
+            ).returning(Comment).options(undefer(Comment.content))
+        ).scalar_one()
+    except IntegrityError as e:
+        db.session.rollback()
+        if is_foreign_key_error(e):
+            return jsonify({'message': 'Post non trouvé'}), 404
+        raise
+
+    # Sérialisation avant le commit (voir create_post): l'auteur est l'utilisateur connecté
+    # et un commentaire tout neuf n'a encore aucun like
+    comment_data = comment.to_dict(author=current_user, likes_count=0)
 
     # Sauvegarde dans la DB
-    db.session.add(comment)
     db.session.commit()
 
     return jsonify({
         'message': 'Commentaire créé avec succès',
-        'comment': comment.to_dict(include_author=True, include_stats=True)
+        'comment': comment_data
     }), 201
 
 
@@ -850,7 +1734,7 @@ def update_comment(current_user, comment_id):
     Sécurité: Seul l'auteur du commentaire ou un admin peut le modifier
     """
     # Recherche du commentaire
-    comment = Comment.query.get(comment_id)
+    comment = db.session.get(Comment, comment_id)
     if not comment:
         return jsonify({'message': 'Commentaire non trouvé'}), 404
 
@@ -860,12 +1744,13 @@ def update_comment(current_user, comment_id):
 
     # Récupération du nouveau contenu
     data = request.get_json()
-    if not data or not data.get('content'):
-        return jsonify({'message': 'Contenu requis'}), 400
+    fields = parse_comment(data)
+    if fields is None:
+        return ERR_CONTENT_REQUIRED()
+    content, = fields
 
-    # Modification
-    comment.content = data['content']
-    comment.updated_at = datetime.utcnow()
+    # Modification (updated_at est rempli par la base grâce à onupdate, voir models.py)
+    comment.content = content
     db.session.commit()
 
     return jsonify({
@@ -889,7 +1774,7 @@ def delete_comment(current_user, comment_id):
     Cascade: Tous les likes du commentaire sont aussi supprimés
     """
     # Recherche du commentaire
-    comment = Comment.query.get(comment_id)
+    comment = db.session.get(Comment, comment_id)
     if not comment:
         return jsonify({'message': 'Commentaire non trouvé'}), 404
 
@@ -897,8 +1782,10 @@ def delete_comment(current_user, comment_id):
     if comment.user_id != current_user.id and not current_user.is_admin:
         return jsonify({'message': 'Accès refusé'}), 403
 
-    # Suppression
-    db.session.delete(comment)
+    # Suppression du commentaire et de ses likes
+    # Un seul DELETE: ses likes sont supprimés par la base (ON DELETE CASCADE, voir delete_user)
+    db.session.execute(delete(Comment).where(Comment.id == comment_id),
+                       execution_options={'synchronize_session': False})
     db.session.commit()
 
     return jsonify({'message': 'Commentaire supprimé avec succès'}), 200
@@ -908,6 +1795,24 @@ def delete_comment(current_user, comment_id):
 # ROUTES POUR LES LIKES
 # ========================================
 
+def count_post_likes(post_id):
+    """
+    Nombre de likes d'un post, compté par la base de données (SELECT count(...))
+
+    La base renvoie un seul entier au lieu de toutes les lignes de likes
+    qu'il faudrait ensuite filtrer et compter en Python.
+    """
+    return db.session.scalar(select(func.count()).select_from(PostLike).where(PostLike.post_id == post_id))
+
+
+def count_comment_likes(comment_id):
+    """
+    Nombre de likes d'un commentaire, compté par la base de données (voir count_post_likes)
+    """
+    return db.session.scalar(select(func.count()).select_from(CommentLike)
+                             .where(CommentLike.comment_id == comment_id))
+
+
 @app.route('/api/posts/<int:post_id>/like', methods=['POST'])
 @token_required
 def toggle_post_like(current_user, post_id):
@@ -930,36 +1835,45 @@ def toggle_post_like(current_user, post_id):
 
     Utilité: Bouton "J'aime" qui change d'état à chaque clic
     """
-    # Vérification que le post existe
-    post = Post.query.get(post_id)
-    if not post:
-        return jsonify({'message': 'Post non trouvé'}), 404
-
-    # Vérifier si l'utilisateur a déjà liké ce post
-    # filter_by avec comment_id=None pour ne chercher que les likes de post (pas de commentaire)
-    existing_like = Like.query.filter_by(user_id=current_user.id, post_id=post_id, comment_id=None).first()
-
-    if existing_like:
-        # CAS 1: L'utilisateur a déjà liké → UNLIKE (retirer le like)
-        db.session.delete(existing_like)
+    # CAS 1: L'utilisateur a déjà liké → UNLIKE (retirer le like)
+    # On tente directement la suppression: rowcount indique si un like existait
+    # (pas de SELECT préalable pour chercher le like ni pour vérifier le post)
+    result = db.session.execute(
+        delete(PostLike).where(PostLike.user_id == current_user.id, PostLike.post_id == post_id),
+        execution_options={'synchronize_session': False}
+    )
+    if result.rowcount:
+        # Recalcul du nombre de likes après suppression (dans la même transaction)
+        likes_count = count_post_likes(post_id)
         db.session.commit()
         return jsonify({
             'message': 'Like retiré',
             'liked': False,  # Pour que le frontend sache qu'il faut désactiver le bouton
-            # Recalcul du nombre de likes après suppression
-            'likes_count': len([like for like in post.likes if like.comment_id is None])
+            'likes_count': likes_count
         }), 200
-    else:
-        # CAS 2: L'utilisateur n'a pas encore liké → LIKE (ajouter un like)
-        like = Like(user_id=current_user.id, post_id=post_id)
-        db.session.add(like)
-        db.session.commit()
-        return jsonify({
-            'message': 'Post liké',
-            'liked': True,  # Pour que le frontend sache qu'il faut activer le bouton
-            # Recalcul du nombre de likes après ajout
-            'likes_count': len([like for like in post.likes if like.comment_id is None])
-        }), 201
+
+    # CAS 2: L'utilisateur n'a pas encore liké → LIKE (ajouter un like)
+    # INSERT ... ON CONFLICT DO NOTHING: un double clic simultané ne crée pas d'erreur,
+    # la clé primaire (user_id, post_id) fait simplement ignorer le second like
+    # Post inexistant: ON CONFLICT ne s'applique pas aux clés étrangères, la base refuse
+    # l'insertion et on répond 404 (pas de SELECT préalable sur le post)
+    try:
+        db.session.execute(
+            insert_ignoring_duplicates(PostLike).values(user_id=current_user.id, post_id=post_id)
+        )
+    except IntegrityError as e:
+        db.session.rollback()
+        if is_foreign_key_error(e):
+            return jsonify({'message': 'Post non trouvé'}), 404
+        raise
+    # Recalcul du nombre de likes après ajout
+    likes_count = count_post_likes(post_id)
+    db.session.commit()
+    return jsonify({
+        'message': 'Post liké',
+        'liked': True,  # Pour que le frontend sache qu'il faut activer le bouton
+        'likes_count': likes_count
+    }), 201
 
 
 @app.route('/api/comments/<int:comment_id>/like', methods=['POST'])
@@ -971,37 +1885,42 @@ def toggle_comment_like(current_user, comment_id):
 
     Même fonctionnement que toggle_post_like mais pour les commentaires
     """
-    # Vérification que le commentaire existe
-    comment = Comment.query.get(comment_id)
-    if not comment:
-        return jsonify({'message': 'Commentaire non trouvé'}), 404
-
-    # Vérifier si déjà liké
-    # Ici post_id=None car c'est un like sur un commentaire
-    existing_like = Like.query.filter_by(user_id=current_user.id, comment_id=comment_id, post_id=None).first()
-
-    if existing_like:
-        # Unlike
-        db.session.delete(existing_like)
+    # Unlike: suppression directe, rowcount indique si le like existait
+    result = db.session.execute(
+        delete(CommentLike).where(CommentLike.user_id == current_user.id, CommentLike.comment_id == comment_id),
+        execution_options={'synchronize_session': False}
+    )
+    if result.rowcount:
+        likes_count = count_comment_likes(comment_id)
         db.session.commit()
         return jsonify({
             'message': 'Like retiré',
             'liked': False,
-            'likes_count': len([like for like in comment.likes if like.post_id is None])
+            'likes_count': likes_count
         }), 200
-    else:
-        # Like
-        like = Like(user_id=current_user.id, comment_id=comment_id)
-        db.session.add(like)
-        db.session.commit()
-        return jsonify({
-            'message': 'Commentaire liké',
-            'liked': True,
-            'likes_count': len([like for like in comment.likes if like.post_id is None])
-        }), 201
+
+    # Like: doublon ignoré (ON CONFLICT DO NOTHING), commentaire inexistant refusé
+    # par la clé étrangère (404)
+    try:
+        db.session.execute(
+            insert_ignoring_duplicates(CommentLike).values(user_id=current_user.id, comment_id=comment_id)
+        )
+    except IntegrityError as e:
+        db.session.rollback()
+        if is_foreign_key_error(e):
+            return jsonify({'message': 'Commentaire non trouvé'}), 404
+        raise
+    likes_count = count_comment_likes(comment_id)
+    db.session.commit()
+    return jsonify({
+        'message': 'Commentaire liké',
+        'liked': True,
+        'likes_count': likes_count
+    }), 201
 
 
 @app.route('/api/posts/<int:post_id>/likes', methods=['GET'])
+@cached_response
 def get_post_likes(post_id):
     """
     Route publique - Liste tous les likes d'un post avec les utilisateurs
@@ -1014,28 +1933,19 @@ def get_post_likes(post_id):
     Utilité: Afficher "Aimé par John, Sarah et 5 autres personnes"
     """
     # Vérification que le post existe
-    post = Post.query.get(post_id)
+    post = db.session.get(Post, post_id)
     if not post:
         return jsonify({'message': 'Post non trouvé'}), 404
 
-    # Récupération de tous les likes du post
-    likes = Like.query.filter_by(post_id=post_id, comment_id=None).all()
+    # Récupération de tous les likes du post avec leurs utilisateurs (une requête, voir POST_LIKES_WITH_USERS)
+    rows = db.session.execute(POST_LIKES_WITH_USERS.where(PostLike.post_id == post_id))
 
     # Pour chaque like, on inclut les infos de l'utilisateur qui a liké
-    return jsonify({
-        'likes': [{
-            'id': like.id,
-            'user': {
-                'id': like.user.id,
-                'username': like.user.username
-            },
-            'created_at': like.created_at.isoformat()
-        } for like in likes],
-        'total': len(likes)
-    }), 200
+    return jsonify(likes_payload(rows)), 200
 
 
 @app.route('/api/comments/<int:comment_id>/likes', methods=['GET'])
+@cached_response
 def get_comment_likes(comment_id):
     """
     Route publique - Liste tous les likes d'un commentaire
@@ -1044,24 +1954,14 @@ def get_comment_likes(comment_id):
     Même fonctionnement que get_post_likes mais pour les commentaires
     """
     # Vérification que le commentaire existe
-    comment = Comment.query.get(comment_id)
+    comment = db.session.get(Comment, comment_id)
     if not comment:
         return jsonify({'message': 'Commentaire non trouvé'}), 404
 
-    # Récupération des likes
-    likes = Like.query.filter_by(comment_id=comment_id, post_id=None).all()
+    # Récupération des likes avec leurs utilisateurs
+    rows = db.session.execute(COMMENT_LIKES_WITH_USERS.where(CommentLike.comment_id == comment_id))
 
-    return jsonify({
-        'likes': [{
-            'id': like.id,
-            'user': {
-                'id': like.user.id,
-                'username': like.user.username
-            },
-            'created_at': like.created_at.isoformat()
-        } for like in likes],
-        'total': len(likes)
-    }), 200
+    return jsonify(likes_payload(rows)), 200
 
 
 @app.route('/api/posts/<int:post_id>/user-liked', methods=['GET'])
@@ -1074,13 +1974,16 @@ def check_user_liked_post(current_user, post_id):
     Utilité: Savoir si le bouton "J'aime" doit être affiché comme actif ou inactif
     """
     # Vérification que le post existe
-    post = Post.query.get(post_id)
+    post = db.session.get(Post, post_id)
     if not post:
         return jsonify({'message': 'Post non trouvé'}), 404
 
     # Chercher si un like existe pour cet utilisateur sur ce post
-    # .first() is not None: Convertit en booléen (True si trouvé, False sinon)
-    liked = Like.query.filter_by(user_id=current_user.id, post_id=post_id, comment_id=None).first() is not None
+    # SELECT EXISTS(...): La base lit directement la clé primaire (user_id, post_id)
+    # et renvoie True/False, sans charger la ligne du like
+    liked = db.session.scalar(select(exists().where(
+        PostLike.user_id == current_user.id, PostLike.post_id == post_id
+    )))
 
     return jsonify({'liked': liked}), 200
 
@@ -1095,12 +1998,14 @@ def check_user_liked_comment(current_user, comment_id):
     Même fonctionnement que check_user_liked_post mais pour les commentaires
     """
     # Vérification que le commentaire existe
-    comment = Comment.query.get(comment_id)
+    comment = db.session.get(Comment, comment_id)
     if not comment:
         return jsonify({'message': 'Commentaire non trouvé'}), 404
 
-    # Vérifier si l'utilisateur a liké ce commentaire
-    liked = Like.query.filter_by(user_id=current_user.id, comment_id=comment_id, post_id=None).first() is not None
+    # Vérifier si l'utilisateur a liké ce commentaire (SELECT EXISTS, voir check_user_liked_post)
+    liked = db.session.scalar(select(exists().where(
+        CommentLike.user_id == current_user.id, CommentLike.comment_id == comment_id
+    )))
 
     return jsonify({'liked': liked}), 200
 
@@ -1110,6 +2015,7 @@ def check_user_liked_comment(current_user, comment_id):
 # ========================================
 
 @app.route('/api/users/<int:user_id>/profile', methods=['GET'])
+@cached_response
 def get_user_profile(user_id):
     """
     Route publique - Récupère le profil public d'un utilisateur
@@ -1127,23 +2033,33 @@ def get_user_profile(user_id):
     Utilité: Page de profil public d'un utilisateur
     """
     # Recherche de l'utilisateur
-    user = User.query.get(user_id)
+    user = db.session.get(User, user_id)
     if not user:
         return jsonify({'message': 'Utilisateur non trouvé'}), 404
 
     # Récupération des 10 posts les plus récents de l'utilisateur
     # limit(10): Ne prend que les 10 premiers résultats
-    posts = Post.query.filter_by(user_id=user_id).order_by(Post.created_at.desc()).limit(10).all()
+    # Les compteurs de likes/commentaires viennent avec chaque post (voir POST_COMMENTS_COUNT)
+    # L'auteur n'est pas inclus dans ces posts: raiseload('*') suffit, pas de chargement d'auteur
+    rows = (Post.query.add_columns(POST_COMMENTS_COUNT, POST_LIKES_COUNT).options(undefer(Post.content), raiseload('*'))
+            .filter_by(user_id=user_id).order_by(Post.created_at.desc(), Post.id.desc()).limit(10).all())
 
     # Calcul des statistiques de l'utilisateur
-    # count(): Compte le nombre total sans tout charger en mémoire (plus efficace)
-    total_posts = Post.query.filter_by(user_id=user_id).count()
-    total_comments = Comment.query.filter_by(user_id=user_id).count()
-    total_likes = Like.query.filter_by(user_id=user_id).count()
+    # Les comptages sont des sous-requêtes d'un seul SELECT: un seul aller-retour
+    # avec la base au lieu de requêtes count() séparées
+    # total_likes: likes donnés sur des posts + likes donnés sur des commentaires
+    total_posts, total_comments, total_likes = db.session.execute(select(
+        select(func.count(Post.id)).where(Post.user_id == user_id).scalar_subquery(),
+        select(func.count(Comment.id)).where(Comment.user_id == user_id).scalar_subquery(),
+        select(func.count()).select_from(PostLike).where(PostLike.user_id == user_id).scalar_subquery()
+        + select(func.count()).select_from(CommentLike).where(CommentLike.user_id == user_id).scalar_subquery()
+    )).one()
 
     return jsonify({
         'user': user.to_dict(),
-        'recent_posts': [post.to_dict(include_author=False, include_stats=True) for post in posts],
+        'recent_posts': [post.to_dict(include_author=False, include_stats=True,
+                                      likes_count=likes_count, comments_count=comments_count)
+                         for post, comments_count, likes_count in rows],
         'stats': {
             'total_posts': total_posts,
             'total_comments': total_comments,
@@ -1179,24 +2095,23 @@ def update_own_profile(current_user):
     # Récupération des nouvelles données
     data = request.get_json()
 
+    # Vérifier que le nouveau username et le nouvel email ne sont pas déjà pris
+    # (une seule requête pour les deux champs, voir find_identity_conflict)
+    conflict = find_identity_conflict(data.get('username'), data.get('email'), current_user.id)
+    if conflict:
+        return jsonify({'message': conflict}), 409
+
     # Modification du username si fourni
     if 'username' in data:
-        # Vérifier que le nouveau username n'est pas déjà pris
-        existing = User.query.filter_by(username=data['username']).first()
-        if existing and existing.id != current_user.id:
-            return jsonify({'message': 'Nom d\'utilisateur déjà existant'}), 409
         current_user.username = data['username']
 
     # Modification de l'email si fourni
     if 'email' in data:
-        # Vérifier que le nouvel email n'est pas déjà pris
-        existing = User.query.filter_by(email=data['email']).first()
-        if existing and existing.id != current_user.id:
-            return jsonify({'message': 'Email déjà existant'}), 409
         current_user.email = data['email']
 
     # Sauvegarde des modifications
     db.session.commit()
+    invalidate_token_cache(current_user.id)
 
     return jsonify({
         'message': 'Profil mis à jour avec succès',
@@ -1234,20 +2149,24 @@ def update_password(current_user):
     data = request.get_json()
 
     # Validation: Les deux mots de passe sont-ils fournis?
-    if not data or not data.get('current_password') or not data.get('new_password'):
-        return jsonify({'message': 'Mot de passe actuel et nouveau mot de passe requis'}), 400
+    fields = parse_password_change(data)
+    if fields is None:
+        return ERR_PASSWORD_FIELDS()
+
+    current_password, new_password = fields
 
     # Vérification de sécurité: L'ancien mot de passe est-il correct?
-    if not current_user.check_password(data['current_password']):
+    if not run_password_hash(current_user.check_password, current_password):
         return jsonify({'message': 'Mot de passe actuel incorrect'}), 401
 
     # Validation du nouveau mot de passe: Au moins 6 caractères
-    if len(data['new_password']) < 6:
+    if len(new_password) < 6:
         return jsonify({'message': 'Le nouveau mot de passe doit contenir au moins 6 caractères'}), 400
 
     # Mise à jour du mot de passe (hashé automatiquement par set_password)
-    current_user.set_password(data['new_password'])
+    run_password_hash(current_user.set_password, new_password)
     db.session.commit()
+    invalidate_token_cache(current_user.id)
 
     return jsonify({'message': 'Mot de passe mis à jour avec succès'}), 200
 
@@ -1275,36 +2194,36 @@ def search_posts():
 
     Fonctionnement:
     - Recherche dans le titre ET le contenu des posts
-    - Insensible à la casse (majuscules/minuscules)
+    - Insensible à la casse (majuscules/minuscules) et aux accents
     - Recherche partielle (ex: "react" trouve "React.js" et "réaction")
+    - Plusieurs mots: les posts doivent contenir tous les mots (début de mot)
+    - Résultats triés par pertinence (SQLite) ou par date (autres bases)
     """
     # Récupération du terme de recherche depuis l'URL
     # Ex: /api/posts/search?q=python → query = "python"
-    query = request.args.get('q', '')
+    # .strip(): Les espaces au début et à la fin ne comptent pas (une recherche "  " est vide)
+    query = request.args.get('q', '').strip()
 
     # Validation: Le terme de recherche doit faire au moins 2 caractères
     if not query or len(query) < 2:
         return jsonify({'message': 'La recherche doit contenir au moins 2 caractères'}), 400
 
-    # Construction du pattern de recherche SQL
-    # f'%{query}%' signifie: Chercher le mot n'importe où dans le texte
-    # Ex: query="python" → pattern="%python%"
-    # Cela trouvera: "Python", "python3", "apprendre python", etc.
-    search_pattern = f'%{query}%'
+    # Identifiants des posts trouvés (mis en cache, voir search_post_ids)
+    # La recherche est insensible à la casse: "Python" et "python" partagent la même entrée du cache
+    # Version = (commits de ce processus, tranche de RESPONSE_CACHE_TTL secondes): les écritures
+    # faites par un autre worker gunicorn sont prises en compte au plus tard à la tranche suivante
+    version = (_response_cache_version, int(time.time()) // app.config['RESPONSE_CACHE_TTL'])
+    post_ids = search_post_ids(version, query.lower())
 
-    # Requête de recherche dans la base de données
-    # db.or_(): Opérateur OU (cherche dans title OU content)
-    # .ilike(): Recherche insensible à la casse (i = insensitive)
-    # .limit(50): Ne retourne que les 50 premiers résultats (évite surcharge)
-    posts = Post.query.filter(
-        db.or_(
-            Post.title.ilike(search_pattern),    # Cherche dans le titre
-            Post.content.ilike(search_pattern)   # OU dans le contenu
-        )
-    ).order_by(Post.created_at.desc()).limit(50).all()
+    # Chargement des posts trouvés (avec auteurs et compteurs), remis dans l'ordre des résultats
+    rows = query_posts_with_stats().filter(Post.id.in_(post_ids)).all() if post_ids else []
+    position = {post_id: index for index, post_id in enumerate(post_ids)}
+    rows.sort(key=lambda row: position[row[0].id])
+
+    posts = [post_row_to_dict(row) for row in rows]
 
     return jsonify({
-        'posts': [post.to_dict(include_author=True, include_stats=True) for post in posts],
+        'posts': posts,
         'total': len(posts),  # Nombre de résultats trouvés
         'query': query        # Terme de recherche utilisé (pour affichage)
     }), 200
@@ -1314,54 +2233,83 @@ def search_posts():
 # INITIALISATION DE LA BASE DE DONNÉES
 # ========================================
 
-@app.before_request
-def create_tables():
+def init_db():
     """
-    Hook exécuté AVANT chaque requête
-    ==================================
+    Initialise la base de données (exécuté UNE fois au démarrage, pas à chaque requête)
+    ====================================================================================
 
     Fonctionnement:
-    1. Vérifie si les tables ont déjà été créées
-    2. Si non, crée toutes les tables de la base de données
+    1. Crée toutes les tables de la base de données (si elles n'existent pas) et leurs index,
+       met à jour celles créées par une version précédente
+    2. Crée l'index de recherche plein texte des posts
     3. Si la DB est vide, crée un compte admin par défaut
 
+    Appelée:
+    - Au lancement avec "python app.py" (voir plus bas)
+    - Au démarrage de gunicorn, une seule fois dans le processus maître (gunicorn.conf.py)
+    - Au chargement de wsgi.py par un autre serveur WSGI
+    - À la main: flask --app app init-db
+    (les trois premiers cas seulement si AUTO_CREATE_TABLES est activé, voir config.py)
+
     Utilité:
     - Création automatique de la DB au premier lancement
-    - Pas besoin de scripts d'initialisation séparés
-    - Pratique pour le développement
+    - Aucune vérification ajoutée au traitement de chaque requête
 
     Note: En production, on utiliserait plutôt des migrations (ex: Alembic)
     """
-    # Vérifier si on a déjà créé les tables
-    # hasattr() vérifie si l'objet 'app' a l'attribut 'tables_created'
-    # Au premier lancement, cet attribut n'existe pas → on crée les tables
-    if not hasattr(app, 'tables_created'):
-        # app.app_context(): Contexte nécessaire pour les opérations sur la DB
-        with app.app_context():
-            # Création de TOUTES les tables définies dans models.py
-            # db.create_all() lit les modèles (User, Post, Comment, Like)
-            # et crée les tables SQL correspondantes si elles n'existent pas
-            db.create_all()
-
-            # Si aucun utilisateur n'existe, créer un admin par défaut
-            # Cela permet de se connecter dès le premier lancement
-            if User.query.count() == 0:
-                admin = User(
-                    username='admin',
-                    email='admin@example.com',
-                    is_admin=True
-                )
-                # Mot de passe par défaut: admin123
-                # IMPORTANT: En production, il faudrait changer ce mot de passe!
-                admin.set_password('admin123')
-                db.session.add(admin)
-                db.session.commit()
-                # Message dans la console du serveur
-                print('Utilisateur admin créé: admin/admin123')
-
-        # Marquer que les tables ont été créées
-        # Cela évite de recréer les tables à chaque requête
-        app.tables_created = True
+    # app.app_context(): Contexte nécessaire pour les opérations sur la DB
+    with app.app_context():
+        # PostgreSQL: username et email sont de type CITEXT (voir case_insensitive_string
+        # dans models.py), un type fourni par une extension qui doit exister avant les tables
+        if db.engine.dialect.name == 'postgresql':
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS citext')
+
+        # Création de TOUTES les tables définies dans models.py
+        # db.create_all() lit les modèles (User, Post, Comment, PostLike, CommentLike)
+        # et crée les tables SQL correspondantes si elles n'existent pas
+        db.create_all()
+
+        # Base créée avant la séparation des likes en deux tables: reprise des anciens likes
+        migrate_legacy_likes()
+
+        # Tables créées par une version précédente (ex: clés étrangères sans ON DELETE CASCADE,
+        # dont dépendent les routes de suppression, dates sans valeur par défaut):
+        # reconstruites avec la définition actuelle
+        rebuilt = rebuild_outdated_tables()
+        if rebuilt:
+            print('Tables mises à jour: ' + ', '.join(rebuilt))
+
+        # create_all() ne touche pas aux tables existantes: on ajoute les index
+        # apparus depuis leur création (IF NOT EXISTS grâce à checkfirst)
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+
+        # Index de recherche plein texte des posts (SQLite), voir models.py
+        create_post_search_index()
+
+        # Si aucun utilisateur n'existe, créer un admin par défaut
+        # Cela permet de se connecter dès le premier lancement
+        if User.query.count() == 0:
+            admin = User(
+                username='admin',
+                email='admin@example.com',
+                is_admin=True
+            )
+            # Mot de passe par défaut: admin123
+            # IMPORTANT: En production, il faudrait changer ce mot de passe!
+            # Le hash est précalculé (voir DEFAULT_ADMIN_HASH dans config.py): pas de
+            # hachage coûteux au démarrage
+            admin.password_hash = app.config['DEFAULT_ADMIN_HASH']
+            db.session.add(admin)
+            db.session.commit()
+            # Message dans la console du serveur
+            print('Utilisateur admin créé: admin/admin123')
+
+
+# Commande en ligne: flask --app app init-db
+app.cli.command('init-db')(init_db)
 
 
 # ========================================
@@ -1383,5 +2331,11 @@ if __name__ == '__main__':
         * ATTENTION: Ne JAMAIS utiliser debug=True en production!
     - port=5000: Le serveur écoute sur le port 5000
         * Le frontend React devra appeler http://localhost:5000/api/...
+
+    En production, utiliser gunicorn à la place (voir wsgi.py et gunicorn.conf.py)
     """
+    # Création des tables avant de démarrer le serveur
+    if app.config['AUTO_CREATE_TABLES']:
+        init_db()
+
     app.run(debug=True, port=5000)
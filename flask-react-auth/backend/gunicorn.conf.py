@@ -0,0 +1,75 @@
+"""
+Configuration de gunicorn (serveur WSGI de production)
+======================================================
+Lancement:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Pourquoi pas un serveur asynchrone (ASGI)?
+Toutes les routes passent leur temps à attendre la base de données.
+Flask-SQLAlchemy est synchrone: au lieu de réécrire l'application en async,
+on donne à chaque processus plusieurs threads (worker 'gthread'). Pendant
+qu'un thread attend SQLite, les autres continuent à traiter des requêtes.
+
+Worker 'gevent' (GUNICORN_WORKER_CLASS=gevent, utilisé par le Procfile):
+chaque processus sert des centaines de connexions keep-alive avec des greenlets.
+gunicorn applique lui-même le monkey patching de gevent avant de charger l'application,
+et le hachage des mots de passe reste exécuté dans de vrais threads (voir app.py).
+
+Toutes les valeurs peuvent être surchargées par des variables d'environnement.
+"""
+
+# os: Lecture des variables d'environnement
+import os
+# multiprocessing: Pour connaître le nombre de cœurs CPU de la machine
+import multiprocessing
+# subprocess/sys: Pour lancer "flask init-db" une seule fois au démarrage (voir on_starting)
+import subprocess
+import sys
+
+# bind: Adresse et port d'écoute (même port que le serveur de développement)
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# workers: Nombre de processus Python indépendants
+# Règle classique: 2 × nombre de cœurs + 1
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+# PASSWORD_HASH_WORKERS: Hachages de mots de passe simultanés par worker (voir config.py)
+# Chaque worker a son propre pool: on partage les cœurs entre les workers pour que la machine
+# entière ne hache jamais plus de mots de passe à la fois qu'elle n'a de cœurs.
+# Les workers héritent de la variable.
+os.environ.setdefault('PASSWORD_HASH_WORKERS', str(max(1, multiprocessing.cpu_count() // workers)))
+
+# worker_class: 'gthread' = chaque processus sert plusieurs requêtes en parallèle avec des threads
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+# threads: Nombre de threads par processus (requêtes traitées en même temps par un worker)
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# worker_connections: Nombre maximum de connexions simultanées par processus (worker 'gevent' uniquement)
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# keepalive: Secondes pendant lesquelles une connexion HTTP reste ouverte entre deux requêtes
+# Évite de rouvrir une connexion TCP pour chaque appel API du frontend
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+
+def on_starting(server):
+    """
+    Crée et met à jour les tables UNE seule fois, dans le processus maître, avant les workers
+
+    Si chaque worker appelait init_db() en important wsgi.py, les 2 × cœurs + 1 processus
+    démarrés en même temps le feraient en parallèle sur une base neuve: "table users already
+    exists", compte admin créé deux fois (UNIQUE constraint failed)... et des workers qui
+    meurent au démarrage.
+
+    init_db est lancé dans un processus séparé ("flask --app app init-db"): le maître n'importe
+    pas l'application (pas de connexions SQLite partagées entre les workers après le fork,
+    monkey patching de gevent appliqué avant l'import de l'application dans chaque worker).
+    Si init_db échoue, gunicorn s'arrête au lieu de démarrer des workers sur une base invalide.
+    """
+    if os.environ.get('AUTO_CREATE_TABLES', '1') != '1':
+        return
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'],
+                   cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    # Les workers héritent de cette variable: wsgi.py ne relance pas init_db dans chacun d'eux
+    os.environ['AUTO_CREATE_TABLES'] = '0'
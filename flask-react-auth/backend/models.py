@@ -11,22 +11,211 @@ Tables définies:
 - User: Utilisateurs de l'application
 - Post: Publications/Articles du forum
 - Comment: Commentaires sur les posts
-- Like: J'aime sur les posts et commentaires
+- PostLike / CommentLike: J'aime sur les posts et sur les commentaires
 """
 
 # Import de SQLAlchemy pour gérer la base de données avec des objets Python
 from flask_sqlalchemy import SQLAlchemy
-# Import des fonctions de sécurité pour hasher et vérifier les mots de passe
-from werkzeug.security import generate_password_hash, check_password_hash
-# Import de datetime pour gérer les dates et heures de création/modification
-from datetime import datetime
+# Import d'Argon2 (argon2-cffi) pour hasher et vérifier les mots de passe
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+# Vérification des anciens hashs werkzeug (comptes créés avant le passage à Argon2)
+from werkzeug.security import check_password_hash
+# Import de select/func et column_property pour les compteurs calculés en SQL (voir plus bas)
+from sqlalchemy import select, func, insert, inspect, DateTime
+# FunctionElement/compiles: Expression SQL dont le code dépend de la base de données (voir utcnow)
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import column_property, deferred
+# CITEXT: Type texte de PostgreSQL qui compare sans tenir compte des majuscules
+from sqlalchemy.dialects.postgresql import CITEXT
+# CreateTable: Code SQL "CREATE TABLE" d'un modèle (voir rebuild_outdated_tables)
+from sqlalchemy.schema import CreateTable
 
 # Initialisation de l'objet SQLAlchemy qui servira à interagir avec la base de données
 # Cet objet 'db' sera utilisé dans app.py pour créer les tables et faire des requêtes
 db = SQLAlchemy()
 
 
-class User(db.Model):
+def make_serializer(*fields):
+    """
+    Génère une fonction qui convertit les colonnes d'un objet en dictionnaire
+    =========================================================================
+
+    Paramètre:
+        *fields (str): Colonnes copiées telles quelles, dans l'ordre des clés du JSON
+
+    Retour:
+        function: serialize(obj) qui retourne le dictionnaire
+
+    Le code est généré une seule fois (à la définition de chaque modèle) puis compilé.
+    Pour make_serializer('id', 'title', 'created_at'), on obtient exactement:
+
+        def serialize(obj):
+            return {'id': obj.id, 'title': obj.title, 'created_at': obj.created_at, }
+
+    Un seul dictionnaire littéral, sans boucle ni liste de champs parcourue à chaque appel
+    (plus direct qu'operator.attrgetter suivi d'un dépaquetage du tuple obtenu).
+    Les méthodes to_dict() s'en servent pour la partie fixe, puis ajoutent les parties optionnelles:
+    générer aussi ces parties (auteur, compteurs) dans le littéral a été mesuré sans gain.
+
+    Les dates restent des objets datetime: c'est orjson (voir ORJSONProvider dans app.py) qui les
+    écrit en texte ISO 8601 ("2024-01-31T12:00:00.123000") lors de l'encodage JSON, en C,
+    sans créer de chaîne Python intermédiaire. Rien n'est donc mémorisé sur l'objet.
+    """
+    # Les noms de colonnes deviennent du code Python généré: on les vérifie
+    for field in fields:
+        if not field.isidentifier():
+            raise ValueError(f'Nom de colonne invalide: {field!r}')
+
+    items = [f'{field!r}: obj.{field}, ' for field in fields]
+    source = 'def serialize(obj):\n    return {' + ''.join(items) + '}'
+
+    # exec() compile le code source et place la fonction 'serialize' dans namespace
+    namespace = {}
+    exec(source, namespace)
+    return namespace['serialize']
+
+
+# === DATE COURANTE CALCULÉE PAR LA BASE ===
+
+class utcnow(FunctionElement):
+    """
+    Expression SQL qui donne la date et l'heure actuelles en UTC
+
+    Sert de valeur par défaut aux colonnes created_at/updated_at: la date est écrite
+    par la base elle-même, sans appeler de fonction Python pour chaque ligne insérée.
+    Le SQL généré dépend de la base de données (voir les fonctions @compiles ci-dessous).
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return 'CURRENT_TIMESTAMP'
+
+
+@compiles(utcnow, 'sqlite')
+def _utcnow_sqlite(element, compiler, **kw):
+    # SQLite n'a pas de vrai type date: SQLAlchemy y range les dates sous forme de texte
+    # "2024-01-31 12:00:00.123456" et les compare comme du texte.
+    # CURRENT_TIMESTAMP donnerait "2024-01-31 12:00:00" (sans les décimales): les comparaisons
+    # avec une date envoyée par Python (ex: curseur de pagination) seraient faussées.
+    # strftime produit le même format, avec les millisecondes (%f) complétées par 000.
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+@compiles(utcnow, 'postgresql')
+def _utcnow_postgresql(element, compiler, **kw):
+    # PostgreSQL: now() est dans le fuseau de la session, on la convertit en UTC
+    return "(now() AT TIME ZONE 'utc')"
+
+
+# === HACHAGE DES MOTS DE PASSE (ARGON2) ===
+
+# Argon2id: fonction de hachage lente ET gourmande en mémoire, ce qui rend les attaques
+# par force brute sur carte graphique beaucoup plus coûteuses que pbkdf2.
+# Le coût est réglé par configure_password_hasher() avec les valeurs de config.py
+# (ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM, ARGON2_SALT_LEN, ARGON2_HASH_LEN)
+# Le PasswordHasher est construit UNE fois par processus: ses paramètres sont validés
+# et son préfixe "$argon2id$v=19$m=...,t=...,p=..." préparé à la construction, pas à chaque hachage
+_password_hasher = PasswordHasher()
+
+
+def configure_password_hasher(time_cost, memory_cost, parallelism, salt_len=16, hash_len=32):
+    """
+    Règle le coût du hachage Argon2 (appelée au démarrage par app.py)
+
+    Paramètres:
+        time_cost (int): Nombre de passes sur la mémoire
+        memory_cost (int): Mémoire utilisée par hachage, en Kio
+        parallelism (int): Nombre de voies de calcul parallèles
+        salt_len (int): Longueur du sel aléatoire, en octets
+        hash_len (int): Longueur du hash calculé, en octets
+
+    Les hashs existants restent valides: ils contiennent leurs propres paramètres.
+    Ceux calculés avec d'anciens paramètres sont recalculés à la connexion suivante
+    (voir User.check_password)
+    """
+    global _password_hasher
+    _password_hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost,
+                                      parallelism=parallelism, hash_len=hash_len,
+                                      salt_len=salt_len)
+
+
+def hash_password(password):
+    """
+    Calcule le hash sécurisé d'un mot de passe
+
+    Paramètre:
+        password (str): Mot de passe en clair
+
+    Retour:
+        str: Hash à stocker dans User.password_hash (format "$argon2id$v=19$m=...")
+
+    Utilisé par User.set_password(), et directement quand l'utilisateur est
+    inséré sans passer par un objet User (voir la route register)
+    """
+    return _password_hasher.hash(password)
+
+
+# === TEXTE INSENSIBLE À LA CASSE ===
+
+def case_insensitive_string(length):
+    """
+    Type de colonne texte dont les comparaisons ignorent les majuscules ("Bob" = "bob")
+
+    Paramètre:
+        length (int): Longueur maximum du texte
+
+    La comparaison est faite par la colonne elle-même, pas par lower() dans la requête:
+    "WHERE email = ?" et la contrainte UNIQUE continuent d'utiliser l'index de la colonne
+    (lower(email) = lower(?) obligerait la base à parcourir toute la table).
+    - SQLite: collation NOCASE (majuscules ASCII uniquement)
+    - PostgreSQL: type CITEXT (nécessite l'extension citext, créée par init_db)
+    - Autres bases: texte normal
+    """
+    return (db.String(length)
+            .with_variant(db.String(length, collation='NOCASE'), 'sqlite')
+            .with_variant(CITEXT(), 'postgresql'))
+
+
+# === INSERTION EN LOT ===
+
+class BulkMixin:
+    """
+    Ajoute aux modèles une méthode d'insertion de nombreuses lignes d'un coup
+
+    Utile pour les scripts d'import ou de remplissage de la base: session.add() pour
+    chaque ligne crée un objet Python par ligne et un INSERT par ligne au moment du commit.
+    """
+
+    @classmethod
+    def bulk_create(cls, session, rows, chunk=10_000):
+        """
+        Insère une liste de lignes dans la table du modèle
+
+        Paramètres:
+            session: Session SQLAlchemy (ex: db.session)
+            rows (list): Liste de dictionnaires {colonne: valeur}, ex: [{'title': ..., 'user_id': 1}, ...]
+            chunk (int): Nombre de lignes envoyées par requête
+
+        Un seul INSERT est préparé puis exécuté pour toute la liste (executemany), par
+        paquets de chunk lignes pour borner la mémoire. Aucun objet du modèle n'est créé
+        et les dates sont remplies par la base (voir utcnow).
+        Les lignes de User doivent déjà contenir password_hash (voir hash_password).
+        L'appelant fait le commit.
+
+        Pour des millions de lignes sur PostgreSQL, COPY (copy_expert de psycopg2)
+        reste plus rapide que tout INSERT.
+        """
+        statement = insert(cls)
+        for start in range(0, len(rows), chunk):
+            session.execute(statement, rows[start:start + chunk])
+
+
+class User(BulkMixin, db.Model):
     """
     Modèle User - Représente un utilisateur de l'application
     =========================================================
@@ -44,7 +233,7 @@ class User(db.Model):
     Relations avec autres tables:
     - posts: Liste des posts créés par cet utilisateur
     - comments: Liste des commentaires créés par cet utilisateur
-    - likes: Liste des likes donnés par cet utilisateur
+    - post_likes / comment_likes: Likes donnés par cet utilisateur
     """
 
     # __tablename__: Nom explicite de la table dans la base de données
@@ -58,22 +247,24 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
     # username: Nom d'utilisateur pour se connecter
-    # - db.String(80): Chaîne de caractères de max 80 caractères
+    # - case_insensitive_string(80): Chaîne de max 80 caractères, comparée sans tenir compte
+    #   des majuscules (voir plus haut): "Bob" et "bob" sont le même nom
     # - unique=True: Deux utilisateurs ne peuvent pas avoir le même username
     # - nullable=False: Ce champ est obligatoire (ne peut pas être vide)
-    username = db.Column(db.String(80), unique=True, nullable=False)
+    username = db.Column(case_insensitive_string(80), unique=True, nullable=False)
 
     # email: Adresse email de l'utilisateur
-    # - db.String(120): Chaîne de max 120 caractères
+    # - case_insensitive_string(120): Chaîne de max 120 caractères, insensible à la casse
     # - unique=True: Deux utilisateurs ne peuvent pas avoir le même email
     # - nullable=False: Ce champ est obligatoire
-    email = db.Column(db.String(120), unique=True, nullable=False)
+    email = db.Column(case_insensitive_string(120), unique=True, nullable=False)
 
     # password_hash: Mot de passe hashé (JAMAIS stocké en clair pour la sécurité!)
-    # - db.String(255): Chaîne de max 255 caractères (un hash est long)
+    # - db.String(512): Chaîne de max 512 caractères (un hash Argon2 est long)
     # - nullable=False: Obligatoire (on ne peut pas créer un compte sans mot de passe)
     # Important: On ne stocke JAMAIS le mot de passe en clair, toujours hashé!
-    password_hash = db.Column(db.String(255), nullable=False)
+    # Et on ne le compare JAMAIS avec "==": toujours User.check_password() (temps constant)
+    password_hash = db.Column(db.String(512), nullable=False)
 
     # is_admin: Booléen indiquant si l'utilisateur a les droits administrateur
     # - db.Boolean: Type booléen (True ou False)
@@ -82,8 +273,10 @@ class User(db.Model):
 
     # created_at: Date et heure de création du compte utilisateur
     # - db.DateTime: Type date + heure
-    # - default=datetime.utcnow: Automatiquement rempli avec la date/heure actuelle (UTC)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # - server_default=utcnow(): Valeur par défaut de la colonne dans la base (DEFAULT ...,
+    #   en UTC, voir utcnow): la date est écrite par la base elle-même,
+    #   aucune fonction Python n'est appelée pour chaque ligne insérée
+    created_at = db.Column(db.DateTime, server_default=utcnow())
 
     # === RELATIONS AVEC D'AUTRES TABLES ===
 
@@ -92,16 +285,25 @@ class User(db.Model):
     # - backref='author': Crée un attribut virtuel 'author' sur Post pour accéder à l'utilisateur
     #   Exemple: mon_post.author renvoie l'utilisateur qui a créé ce post
     # - lazy=True: Les posts ne sont chargés que quand on y accède (optimisation mémoire)
-    # - cascade='all, delete-orphan': Si on supprime un utilisateur, tous ses posts sont aussi supprimés
-    posts = db.relationship('Post', backref='author', lazy=True, cascade='all, delete-orphan')
+    # - cascade='all': Les posts ajoutés/supprimés via la session suivent l'utilisateur
+    # - passive_deletes=True: Quand un utilisateur est supprimé, SQLAlchemy ne charge PAS ses posts
+    #   pour les supprimer un par un: c'est la base qui s'en charge (ON DELETE CASCADE sur
+    #   Post.user_id), en une seule opération
+    posts = db.relationship('Post', backref='author', lazy=True, cascade='all', passive_deletes=True)
 
     # Relation One-to-Many: Un utilisateur peut avoir plusieurs commentaires
-    # Même principe que pour posts
-    comments = db.relationship('Comment', backref='author', lazy=True, cascade='all, delete-orphan')
-
-    # Relation One-to-Many: Un utilisateur peut avoir plusieurs likes
-    # Même principe que pour posts
-    likes = db.relationship('Like', backref='user', lazy=True, cascade='all, delete-orphan')
+    # Même principe que pour posts, avec lazy='write_only': la liste ne peut pas être chargée
+    # d'un coup (des milliers de lignes pour un utilisateur actif). Pour la lire, il faut une
+    # requête explicite: db.session.scalars(user.comments.select().limit(20))
+    comments = db.relationship('Comment', backref='author', lazy='write_only', cascade='all',
+                               passive_deletes=True)
+
+    # Relations One-to-Many: Un utilisateur peut avoir plusieurs likes (posts et commentaires)
+    # Même principe que pour comments
+    post_likes = db.relationship('PostLike', backref='user', lazy='write_only', cascade='all',
+                                 passive_deletes=True)
+    comment_likes = db.relationship('CommentLike', backref='user', lazy='write_only', cascade='all',
+                                    passive_deletes=True)
 
     # === MÉTHODES DE LA CLASSE ===
 
@@ -114,13 +316,13 @@ class User(db.Model):
 
         Fonctionnement:
         1. Prend le mot de passe en clair (ex: "monMotDePasse123")
-        2. Le transforme en hash illisible (ex: "pbkdf2:sha256:260000$...")
+        2. Le transforme en hash illisible (ex: "$argon2id$v=19$m=65536,t=2,p=2$...")
         3. Stocke ce hash dans password_hash
 
         Pourquoi hasher? Pour la sécurité! Si quelqu'un accède à la base de données,
         il ne peut pas lire les mots de passe car ils sont hashés (irréversible).
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         """
@@ -138,36 +340,47 @@ class User(db.Model):
         3. Retourne True si ça correspond, False sinon
 
         Utilisation typique: Lors du login pour vérifier les identifiants
-        """
-        return check_password_hash(self.password_hash, password)
-
-    def to_dict(self, include_sensitive=False):
-        """
-        Convertit l'objet User en dictionnaire Python (pour JSON/API)
 
-        Paramètre:
-            include_sensitive (bool): Si True, inclut les données sensibles (password_hash)
-
-        Retour:
-            dict: Dictionnaire contenant les données de l'utilisateur
+        Si le mot de passe est correct mais que le hash est ancien (format werkzeug,
+        ou paramètres Argon2 modifiés depuis), il est recalculé avec les réglages actuels:
+        password_hash est alors modifié et l'appelant doit enregistrer (commit) l'utilisateur.
 
-        Pourquoi cette méthode?
-        - Les APIs REST renvoient du JSON, pas des objets Python
-        - Cette méthode facilite la conversion: user.to_dict() → JSON
-        - On peut choisir d'inclure ou non les données sensibles
+        RÈGLE: Toute vérification passe par cette méthode, jamais par une comparaison "=="
+        sur password_hash. "==" s'arrête au premier caractère différent: le temps de réponse
+        révèle combien de caractères sont corrects (attaque temporelle).
+        _password_hasher.verify() (Argon2) et check_password_hash() (werkzeug, qui utilise
+        hmac.compare_digest) comparent en temps constant. Un éventuel autre format de hash
+        devra lui aussi finir par hmac.compare_digest().
         """
-        # Dictionnaire de base avec les données publiques
-        data = {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'is_admin': self.is_admin,
-            'created_at': self.created_at.isoformat()  # .isoformat() convertit la date en format texte
-        }
-        # Si demandé, ajouter les données sensibles (normalement jamais envoyé au frontend!)
-        if include_sensitive:
-            data['password_hash'] = self.password_hash
-        return data
+        if not self.password_hash.startswith('$argon2'):
+            # Ancien hash werkzeug (pbkdf2/scrypt): vérifié puis converti en Argon2
+            if not check_password_hash(self.password_hash, password):
+                return False
+            self.set_password(password)
+            return True
+
+        try:
+            _password_hasher.verify(self.password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+        if _password_hasher.check_needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
+
+    # Sérialiseurs générés (voir make_serializer), utilisés directement comme méthodes:
+    # user.to_dict() exécute le dictionnaire littéral, sans méthode intermédiaire
+    # ni test "faut-il ajouter le hash?"
+    #
+    # to_dict(): Données publiques de l'utilisateur, pour l'API JSON
+    # - Les APIs REST renvoient du JSON, pas des objets Python
+    # - Cette méthode facilite la conversion: user.to_dict() → JSON
+    # - Ne contient JAMAIS password_hash
+    to_dict = make_serializer('id', 'username', 'email', 'is_admin', 'created_at')
+
+    # _full_to_dict(): Données publiques + password_hash (scripts d'export, jamais le frontend!)
+    # Méthode séparée et appel explicite: chaque endroit où le hash quitte la base
+    # se retrouve en cherchant "_full_to_dict" dans le code
+    _full_to_dict = make_serializer('id', 'username', 'email', 'is_admin', 'created_at', 'password_hash')
 
     def __repr__(self):
         """
@@ -182,7 +395,7 @@ class User(db.Model):
         return f'<User {self.username}>'
 
 
-class Post(db.Model):
+class Post(BulkMixin, db.Model):
     """
     Modèle Post - Représente une publication/article du forum
     ==========================================================
@@ -219,77 +432,112 @@ class Post(db.Model):
     # content: Contenu complet du post
     # - db.Text: Type texte (pas de limite de longueur contrairement à String)
     # - nullable=False: Obligatoire (un post doit avoir du contenu)
-    content = db.Column(db.Text, nullable=False)
+    # - deferred(): Colonne différée, absente du SELECT par défaut. Les routes qui chargent un
+    #   post seulement pour vérifier qu'il existe (likes, suppression...) ne lisent plus le texte.
+    #   Les routes qui l'affichent le demandent avec undefer(Post.content) (voir app.py);
+    #   ailleurs, y accéder déclenche une requête supplémentaire
+    content = deferred(db.Column(db.Text, nullable=False))
 
     # user_id: Clé étrangère vers la table users
     # - db.Integer: Type entier (pour stocker l'id d'un utilisateur)
     # - db.ForeignKey('users.id'): Référence la colonne 'id' de la table 'users'
     # - nullable=False: Obligatoire (un post doit toujours avoir un auteur)
+    # - ondelete='CASCADE': Si l'utilisateur est supprimé, la base supprime aussi ses posts
     # Principe: Cette colonne crée le lien entre Post et User
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
 
     # created_at: Date et heure de création du post
-    # - default=datetime.utcnow: Automatiquement rempli à la création
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # - server_default=utcnow(): Rempli par la base à la création (voir User.created_at)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
 
     # updated_at: Date et heure de dernière modification
-    # - default=datetime.utcnow: Date initiale = date de création
-    # - onupdate=datetime.utcnow: Automatiquement mis à jour quand on modifie le post
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # - server_default=utcnow(): Date initiale = date de création
+    # - onupdate=utcnow(): Automatiquement mis à jour quand on modifie le post,
+    #   la date est calculée par la base dans l'UPDATE (en UTC)
+    updated_at = db.Column(db.DateTime, server_default=utcnow(), onupdate=utcnow())
+
+    # === INDEX DE LA TABLE ===
+
+    # Index composés qui suivent l'ordre des listes de l'API: la base lit les posts déjà
+    # triés dans l'index au lieu de tous les trier à chaque page
+    __table_args__ = (
+        # Fil d'actualité: ORDER BY created_at DESC, id DESC (voir get_posts dans app.py)
+        db.Index('ix_posts_created', 'created_at', 'id'),
+        # Profil: posts récents d'un utilisateur (WHERE user_id = ? ORDER BY created_at DESC)
+        # Sert aussi à toute recherche par user_id (comptage, suppression d'un utilisateur)
+        db.Index('ix_posts_user_created', 'user_id', 'created_at'),
+    )
 
     # === RELATIONS AVEC D'AUTRES TABLES ===
 
+    # Les listes comments et likes restent en chargement paresseux (lazy=True) et ne sont
+    # jamais parcourues par l'API: les compteurs viennent de colonnes calculées (voir la fin
+    # du fichier) et les suppressions sont faites par la base (ON DELETE CASCADE, passive_deletes).
+    # lazy='selectin' les chargerait entièrement à CHAQUE lecture d'un post, même pour le modifier.
+    # Quand une requête a besoin d'une relation, elle le demande explicitement:
+    # selectinload() (une requête "WHERE ... IN (...)" pour toute la liste) + raiseload('*')
+    # pour interdire les autres (voir POST_LOAD_OPTIONS dans app.py).
+    # subqueryload() est volontairement évité: il répète la requête d'origine en sous-requête,
+    # ce qui est plus lent que selectinload sur les grosses listes.
+
     # Relation One-to-Many: Un post peut avoir plusieurs commentaires
     # - 'Comment': Classe liée
     # - backref='post': Permet d'accéder au post depuis un commentaire (comment.post)
-    # - cascade='all, delete-orphan': Si on supprime le post, tous ses commentaires sont supprimés
-    comments = db.relationship('Comment', backref='post', lazy=True, cascade='all, delete-orphan')
+    # - cascade='all' + passive_deletes=True: Si on supprime le post, tous ses commentaires
+    #   sont supprimés par la base (ON DELETE CASCADE), sans être chargés (voir User.posts)
+    comments = db.relationship('Comment', backref='post', lazy=True, cascade='all', passive_deletes=True)
 
-    # Relation One-to-Many: Un post peut avoir plusieurs likes
-    # - primaryjoin: Condition spéciale pour ne récupérer que les likes du POST (pas des commentaires)
-    # Explication: Un Like peut être sur un post OU un commentaire.
-    # On veut seulement les likes où post_id est rempli ET comment_id est NULL
-    likes = db.relationship('Like', backref='post', lazy=True, cascade='all, delete-orphan',
-                           primaryjoin="and_(Post.id==Like.post_id, Like.comment_id==None)")
+    # Relation One-to-Many: Un post peut avoir plusieurs likes (table post_likes)
+    likes = db.relationship('PostLike', backref='post', lazy=True, cascade='all', passive_deletes=True)
 
     # === MÉTHODES DE LA CLASSE ===
 
-    def to_dict(self, include_author=True, include_stats=True):
+    # Sérialiseur généré des colonnes du post (voir make_serializer)
+    _columns_dict = staticmethod(make_serializer('id', 'title', 'content', 'user_id',
+                                                 'created_at', 'updated_at'))
+
+    def to_dict(self, include_author=True, include_stats=True, likes_count=None, comments_count=None, author=None):
         """
         Convertit le post en dictionnaire pour l'API JSON
 
         Paramètres:
             include_author (bool): Si True, inclut les infos de l'auteur du post
             include_stats (bool): Si True, inclut les statistiques (nombre de likes/comments)
+            likes_count (int): Nombre de likes déjà calculé par l'appelant (évite une requête)
+            comments_count (int): Nombre de commentaires déjà calculé par l'appelant (évite une requête)
+            author (User): Auteur déjà connu de l'appelant (évite de charger self.author)
 
         Retour:
             dict: Dictionnaire avec toutes les données du post
 
         Utilité: Préparer les données pour les envoyer au frontend en JSON
         """
-        # Données de base du post
-        data = {
-            'id': self.id,
-            'title': self.title,
-            'content': self.content,
-            'user_id': self.user_id,
-            'created_at': self.created_at.isoformat(),  # Convertit la date en format ISO (texte)
-            'updated_at': self.updated_at.isoformat()
-        }
+        # Données de base du post (voir make_serializer)
+        data = self._columns_dict(self)
 
         # Si demandé ET que l'auteur existe, ajouter les infos de l'auteur
-        if include_author and self.author:
-            data['author'] = {
-                'id': self.author.id,
-                'username': self.author.username
-            }
+        # L'auteur fourni par l'appelant est utilisé en priorité (ex: l'utilisateur connecté)
+        if include_author:
+            # "is None" et non "or": on teste la présence d'une valeur, pas sa "vérité"
+            if author is None:
+                author = self.author
+            if author is not None:
+                data['author'] = {
+                    'id': author.id,
+                    'username': author.username
+                }
 
         # Si demandé, calculer et ajouter les statistiques
         if include_stats:
-            # Compte le nombre de likes sur ce post (seulement ceux où comment_id est None)
-            data['likes_count'] = len([like for like in self.likes if like.comment_id is None])
-            # Compte le nombre total de commentaires
-            data['comments_count'] = len(self.comments)
+            # Les compteurs fournis par l'appelant (déjà calculés par la base) sont utilisés en priorité
+            # Sinon, les colonnes calculées self.likes_count / self.comments_count (voir la fin du
+            # fichier) comptent en SQL, sans charger les likes ni les commentaires
+            if likes_count is None:
+                likes_count = self.likes_count
+            if comments_count is None:
+                comments_count = self.comments_count
+            data['likes_count'] = likes_count
+            data['comments_count'] = comments_count
 
         return data
 
@@ -301,7 +549,7 @@ class Post(db.Model):
         return f'<Post {self.id}: {self.title}>'
 
 
-class Comment(db.Model):
+class Comment(BulkMixin, db.Model):
     """
     Modèle Comment - Représente un commentaire sur un post
     =======================================================
@@ -333,68 +581,83 @@ class Comment(db.Model):
     # content: Texte du commentaire
     # - db.Text: Pas de limite de longueur
     # - nullable=False: Obligatoire (un commentaire vide n'a pas de sens)
-    content = db.Column(db.Text, nullable=False)
+    # - deferred(): Colonne différée, comme Post.content
+    content = deferred(db.Column(db.Text, nullable=False))
 
     # user_id: Clé étrangère vers l'utilisateur qui a écrit le commentaire
     # - db.ForeignKey('users.id'): Référence la table users
     # - nullable=False: Un commentaire doit toujours avoir un auteur
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # - ondelete='CASCADE': Supprimé par la base avec son auteur (de même pour post_id avec son post)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
 
     # post_id: Clé étrangère vers le post sur lequel le commentaire est posté
     # - db.ForeignKey('posts.id'): Référence la table posts
     # - nullable=False: Un commentaire doit toujours être lié à un post
-    post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=False)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), nullable=False)
 
-    # created_at: Date et heure de création du commentaire
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # created_at: Date et heure de création du commentaire (remplie par la base)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
 
     # updated_at: Date et heure de dernière modification
     # onupdate: Se met à jour automatiquement quand on modifie le commentaire
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # (utcnow(): date calculée par la base dans l'UPDATE, pas par Python)
+    updated_at = db.Column(db.DateTime, server_default=utcnow(), onupdate=utcnow())
+
+    # === INDEX DE LA TABLE ===
+
+    __table_args__ = (
+        # Commentaires d'un post dans l'ordre (WHERE post_id = ? ORDER BY created_at ASC)
+        # Sert aussi au comptage des commentaires d'un post (Post.comments_count)
+        db.Index('ix_comments_post_created', 'post_id', 'created_at'),
+        # Commentaires d'un utilisateur (statistiques du profil, suppression d'un utilisateur)
+        db.Index('ix_comments_user', 'user_id'),
+    )
 
     # === RELATIONS AVEC D'AUTRES TABLES ===
 
-    # Relation One-to-Many: Un commentaire peut avoir plusieurs likes
-    # primaryjoin: Condition pour ne récupérer que les likes du COMMENTAIRE (post_id doit être None)
-    # Explication: Comme un Like peut être sur un post OU un commentaire,
-    # on spécifie qu'on veut seulement ceux où comment_id correspond ET post_id est NULL
-    likes = db.relationship('Like', backref='comment', lazy=True, cascade='all, delete-orphan',
-                           primaryjoin="and_(Comment.id==Like.comment_id, Like.post_id==None)")
+    # Relation One-to-Many: Un commentaire peut avoir plusieurs likes (table comment_likes)
+    likes = db.relationship('CommentLike', backref='comment', lazy=True, cascade='all', passive_deletes=True)
 
     # === MÉTHODES DE LA CLASSE ===
 
-    def to_dict(self, include_author=True, include_stats=True):
+    # Sérialiseur généré des colonnes du commentaire (voir make_serializer)
+    _columns_dict = staticmethod(make_serializer('id', 'content', 'user_id', 'post_id',
+                                                 'created_at', 'updated_at'))
+
+    def to_dict(self, include_author=True, include_stats=True, likes_count=None, author=None):
         """
         Convertit le commentaire en dictionnaire pour l'API JSON
 
         Paramètres:
             include_author (bool): Si True, inclut les infos de l'auteur
             include_stats (bool): Si True, inclut le nombre de likes
+            likes_count (int): Nombre de likes déjà connu de l'appelant (évite une requête)
+            author (User): Auteur déjà connu de l'appelant (évite de charger self.author)
 
         Retour:
             dict: Dictionnaire avec toutes les données du commentaire
         """
         # Données de base du commentaire
-        data = {
-            'id': self.id,
-            'content': self.content,
-            'user_id': self.user_id,
-            'post_id': self.post_id,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
-        }
+        data = self._columns_dict(self)
 
         # Si demandé, ajouter les infos de l'auteur du commentaire
-        if include_author and self.author:
-            data['author'] = {
-                'id': self.author.id,
-                'username': self.author.username
-            }
+        # L'auteur fourni par l'appelant est utilisé en priorité (ex: l'utilisateur connecté)
+        if include_author:
+            if author is None:
+                author = self.author
+            if author is not None:
+                data['author'] = {
+                    'id': author.id,
+                    'username': author.username
+                }
 
         # Si demandé, compter et ajouter le nombre de likes
         if include_stats:
             # Compte seulement les likes où post_id est None (= likes du commentaire uniquement)
-            data['likes_count'] = len([like for like in self.likes if like.post_id is None])
+            # sauf si l'appelant connaît déjà le nombre (colonne calculée, voir la fin du fichier)
+            if likes_count is None:
+                likes_count = self.likes_count
+            data['likes_count'] = likes_count
 
         return data
 
@@ -406,104 +669,350 @@ class Comment(db.Model):
         return f'<Comment {self.id} on Post {self.post_id}>'
 
 
-class Like(db.Model):
+class PostLike(BulkMixin, db.Model):
     """
-    Modèle Like - Représente un "j'aime" sur un post OU un commentaire
-    ===================================================================
-    Cette classe définit la table 'likes' dans la base de données.
-    Un like peut être sur un POST ou sur un COMMENTAIRE, mais pas les deux en même temps.
+    Modèle PostLike - Représente un "j'aime" d'un utilisateur sur un post
+    ======================================================================
+    Cette classe définit la table 'post_likes' dans la base de données.
+    Les likes sur les commentaires sont dans une table séparée (voir CommentLike):
+    chaque table n'a que les colonnes utiles, sans colonne NULL à filtrer.
 
     Attributs:
-    - id: Identifiant unique du like
     - user_id: ID de l'utilisateur qui a liké (clé étrangère)
-    - post_id: ID du post liké (NULL si c'est un commentaire qui est liké)
-    - comment_id: ID du commentaire liké (NULL si c'est un post qui est liké)
+    - post_id: ID du post liké (clé étrangère)
     - created_at: Date du like
 
-    Contraintes importantes:
-    - Un utilisateur ne peut liker qu'une seule fois un post ou commentaire donné
-    - Soit post_id est rempli (like sur un post), soit comment_id (like sur un commentaire)
-    - Les deux ne peuvent pas être remplis en même temps, ni être NULL en même temps
+    Contrainte importante:
+    - Un utilisateur ne peut liker qu'une seule fois un post donné
+      (la clé primaire est le couple (user_id, post_id))
     """
 
     # Nom de la table dans la base de données
-    __tablename__ = 'likes'
+    __tablename__ = 'post_likes'
 
     # === COLONNES DE LA TABLE ===
 
-    # id: Identifiant unique du like
-    id = db.Column(db.Integer, primary_key=True)
-
     # user_id: Clé étrangère vers l'utilisateur qui a effectué le like
-    # - nullable=False: Un like doit toujours avoir un auteur
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-
-    # post_id: ID du post liké (si c'est un like sur un post)
-    # - nullable=True: Peut être NULL (car si c'est un like sur un commentaire, ce champ est vide)
-    post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=True)
+    # - primary_key=True (avec post_id): Le couple (user_id, post_id) identifie le like,
+    #   ce qui interdit à un utilisateur de liker deux fois le même post
+    # - ondelete='CASCADE': Le like disparaît avec son auteur ou son post
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
 
-    # comment_id: ID du commentaire liké (si c'est un like sur un commentaire)
-    # - nullable=True: Peut être NULL (car si c'est un like sur un post, ce champ est vide)
-    comment_id = db.Column(db.Integer, db.ForeignKey('comments.id'), nullable=True)
+    # post_id: ID du post liké
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
 
-    # created_at: Date et heure du like
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # created_at: Date et heure du like (remplie par la base)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
 
-    # === CONTRAINTES DE LA TABLE ===
+    # === INDEX DE LA TABLE ===
 
-    # __table_args__: Tuple de contraintes spéciales pour cette table
     __table_args__ = (
-        # Contrainte 1: CheckConstraint - Vérifie qu'un like est soit sur un post, soit sur un commentaire
-        # Logique: (post_id rempli ET comment_id NULL) OU (post_id NULL ET comment_id rempli)
-        # Cela empêche:
-        #   - Les deux champs remplis en même temps (like sur post ET commentaire = impossible!)
-        #   - Les deux champs vides en même temps (like sur rien = pas de sens!)
-        db.CheckConstraint('(post_id IS NOT NULL AND comment_id IS NULL) OR (post_id IS NULL AND comment_id IS NOT NULL)',
-                          name='check_like_target'),
-
-        # Contrainte 2: UniqueConstraint - Un utilisateur ne peut liker qu'une fois le même post/commentaire
-        # Explication: La combinaison (user_id, post_id, comment_id) doit être unique
-        # Exemple: L'utilisateur 5 ne peut pas liker deux fois le post 10
-        # Si user_id=5, post_id=10, comment_id=NULL existe déjà, impossible d'insérer la même ligne
-        db.UniqueConstraint('user_id', 'post_id', 'comment_id', name='unique_user_like'),
+        # Comptage et liste des likes d'un post: "WHERE post_id = ?"
+        # (la clé primaire commence par user_id, elle ne sert pas à cette recherche)
+        db.Index('ix_post_likes_post', 'post_id'),
+        # sqlite_with_rowid=False: Table SQLite "WITHOUT ROWID", rangée directement dans l'ordre
+        # de la clé primaire (pas de numéro de ligne caché ni d'index séparé pour la clé)
+        {'sqlite_with_rowid': False},
     )
 
     # === MÉTHODES DE LA CLASSE ===
 
+    # Sérialiseur généré des colonnes (voir make_serializer)
+    _columns_dict = staticmethod(make_serializer('user_id', 'post_id', 'created_at'))
+
     def to_dict(self):
         """
         Convertit le like en dictionnaire pour l'API JSON
 
         Retour:
             dict: Dictionnaire contenant les données du like
+        """
+        return self._columns_dict(self)
 
-        Note: Inclut soit post_id, soit comment_id, selon le type de like
+    def __repr__(self):
+        """
+        Représentation textuelle pour le debugging
+        Exemple: "<Like by User 5 on Post 10>"
         """
-        # Données de base toujours présentes
-        data = {
-            'id': self.id,
-            'user_id': self.user_id,
-            'created_at': self.created_at.isoformat()
-        }
+        return f'<Like by User {self.user_id} on Post {self.post_id}>'
+
 
-        # Ajouter post_id seulement s'il existe (like sur un post)
-        if self.post_id:
-            data['post_id'] = self.post_id
+class CommentLike(BulkMixin, db.Model):
+    """
+    Modèle CommentLike - Représente un "j'aime" d'un utilisateur sur un commentaire
+    ================================================================================
+    Cette classe définit la table 'comment_likes'.
+    Même structure que PostLike, avec comment_id à la place de post_id.
+    """
 
-        # Ajouter comment_id seulement s'il existe (like sur un commentaire)
-        if self.comment_id:
-            data['comment_id'] = self.comment_id
+    # Nom de la table dans la base de données
+    __tablename__ = 'comment_likes'
 
-        return data
+    # === COLONNES DE LA TABLE ===
+
+    # Clé primaire (user_id, comment_id): un seul like par utilisateur et par commentaire
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    comment_id = db.Column(db.Integer, db.ForeignKey('comments.id', ondelete='CASCADE'), primary_key=True)
+
+    # created_at: Date et heure du like (remplie par la base)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
+
+    # === INDEX DE LA TABLE ===
+
+    __table_args__ = (
+        # Comptage et liste des likes d'un commentaire: "WHERE comment_id = ?"
+        db.Index('ix_comment_likes_comment', 'comment_id'),
+        {'sqlite_with_rowid': False},
+    )
+
+    # === MÉTHODES DE LA CLASSE ===
+
+    # Sérialiseur généré des colonnes (voir make_serializer)
+    _columns_dict = staticmethod(make_serializer('user_id', 'comment_id', 'created_at'))
+
+    def to_dict(self):
+        """
+        Convertit le like en dictionnaire pour l'API JSON
+        """
+        return self._columns_dict(self)
 
     def __repr__(self):
         """
         Représentation textuelle pour le debugging
-        Détermine automatiquement si c'est un like sur un post ou un commentaire
-        Exemples:
-        - "<Like by User 5 on Post 10>"
-        - "<Like by User 3 on Comment 25>"
+        Exemple: "<Like by User 3 on Comment 25>"
         """
-        # Condition ternaire: si post_id existe, afficher "Post X", sinon "Comment Y"
-        target = f'Post {self.post_id}' if self.post_id else f'Comment {self.comment_id}'
-        return f'<Like by User {self.user_id} on {target}>'
+        return f'<Like by User {self.user_id} on Comment {self.comment_id}>'
+
+
+# === COMPTEURS CALCULÉS PAR LA BASE DE DONNÉES ===
+
+# Nombre de likes et de commentaires, sous forme de colonnes calculées (column_property):
+# une sous-requête corrélée "(SELECT count(...) WHERE post_id = posts.id)" au lieu de charger
+# toutes les lignes de self.likes / self.comments juste pour les compter.
+# Définies ici car elles ont besoin de tous les modèles (Post, Comment, PostLike, CommentLike).
+# - deferred=True: Pas calculées lors d'un chargement normal, seulement au premier accès
+#   (une requête scalaire) ou quand la requête les inclut (app.py, voir query_posts_with_stats)
+# - group='post_stats': Les deux compteurs d'un post sont chargés ensemble, en une seule requête
+Post.likes_count = column_property(
+    select(func.count())
+    .where(PostLike.post_id == Post.id)
+    .correlate_except(PostLike).scalar_subquery(),
+    deferred=True, group='post_stats'
+)
+Post.comments_count = column_property(
+    select(func.count(Comment.id))
+    .where(Comment.post_id == Post.id)
+    .correlate_except(Comment).scalar_subquery(),
+    deferred=True, group='post_stats'
+)
+Comment.likes_count = column_property(
+    select(func.count())
+    .where(CommentLike.comment_id == Comment.id)
+    .correlate_except(CommentLike).scalar_subquery(),
+    deferred=True
+)
+
+
+# === REPRISE DE L'ANCIENNE TABLE DES LIKES ===
+
+# Avant PostLike/CommentLike, tous les likes étaient dans une seule table 'likes'
+# (post_id OU comment_id rempli). Ces requêtes recopient ses lignes dans les deux nouvelles
+# tables (un seul like par utilisateur et par cible, le plus ancien) puis la suppriment.
+LEGACY_LIKES_MIGRATION = (
+    """INSERT INTO post_likes (user_id, post_id, created_at)
+        SELECT user_id, post_id, MIN(created_at) FROM likes
+        WHERE comment_id IS NULL GROUP BY user_id, post_id""",
+    """INSERT INTO comment_likes (user_id, comment_id, created_at)
+        SELECT user_id, comment_id, MIN(created_at) FROM likes
+        WHERE post_id IS NULL GROUP BY user_id, comment_id""",
+    "DROP TABLE likes",
+)
+
+
+def migrate_legacy_likes():
+    """
+    Reprend les likes de l'ancienne table 'likes' si elle existe encore
+
+    Retour:
+        bool: True si des likes ont été repris, False s'il n'y avait rien à faire
+
+    À appeler après db.create_all() (les nouvelles tables doivent exister).
+    Tout est fait dans une seule transaction: en cas d'erreur, rien n'est modifié.
+    """
+    if not inspect(db.engine).has_table('likes'):
+        return False
+    for statement in LEGACY_LIKES_MIGRATION:
+        db.session.execute(db.text(statement))
+    db.session.commit()
+    return True
+
+
+# === MISE À JOUR DES TABLES EXISTANTES (SQLite) ===
+
+# db.create_all() ne modifie jamais une table existante. Une base créée par une version
+# précédente garde donc:
+# - ses anciennes colonnes created_at/updated_at, sans valeur par défaut: maintenant que
+#   c'est la base qui remplit ces dates, les nouvelles lignes y resteraient vides
+# - ses anciennes clés étrangères (sans ON DELETE CASCADE): avec PRAGMA foreign_keys=ON,
+#   supprimer un post ou un utilisateur y échouerait
+# SQLite ne sait modifier ni une colonne ni une clé étrangère existante (pas d'ALTER COLUMN):
+# la table est reconstruite, selon la méthode décrite dans la documentation de SQLite
+# (https://www.sqlite.org/lang_altertable.html#otheralter).
+
+def table_is_outdated(connection, table):
+    """
+    Indique si une table existante a été créée avec une ancienne définition du modèle
+
+    Paramètres:
+        connection: Connexion SQLAlchemy à la base SQLite
+        table (Table): Table du modèle (ex: Post.__table__)
+
+    Retour:
+        bool: True si la table doit être reconstruite
+
+    Comparés:
+    - La règle ON DELETE de chaque clé étrangère (CASCADE dans les modèles)
+    - La valeur par défaut des colonnes remplies par la base (server_default, ex: created_at)
+    """
+    on_delete = {row.from_column: row.on_delete for row in connection.exec_driver_sql(
+        f'SELECT "from" AS from_column, on_delete FROM pragma_foreign_key_list(\'{table.name}\')'
+    )}
+    if any(on_delete.get(fk.parent.name) != (fk.ondelete or 'NO ACTION').upper()
+           for fk in table.foreign_keys):
+        return True
+
+    defaults = {row.name: row.dflt_value for row in connection.exec_driver_sql(
+        f"SELECT name, dflt_value FROM pragma_table_info('{table.name}')"
+    )}
+    return any(column.server_default is not None and defaults.get(column.name) is None
+               for column in table.columns if column.name in defaults)
+
+
+def rebuild_table(connection, table):
+    """
+    Reconstruit une table avec la définition actuelle de son modèle, en gardant ses lignes
+
+    Paramètres:
+        connection: Connexion SQLAlchemy, dans une transaction, clés étrangères désactivées
+        table (Table): Table du modèle à reconstruire
+
+    Étapes: CREATE TABLE new_x → copie des lignes → DROP TABLE x → RENAME new_x en x
+    Les identifiants sont recopiés: les lignes des autres tables qui pointent vers
+    celle-ci restent valides. Les index et les triggers disparaissent avec l'ancienne
+    table: init_db les recrée ensuite (IF NOT EXISTS).
+    Les contraintes actuelles s'appliquent à la copie: par exemple deux comptes dont les noms
+    ne diffèrent que par la casse font échouer la reconstruction de users (UNIQUE ... NOCASE).
+    """
+    temporary = f'new_{table.name}'
+    ddl = str(CreateTable(table).compile(dialect=connection.dialect))
+    ddl = ddl.replace(f'CREATE TABLE {table.name} (', f'CREATE TABLE {temporary} (', 1)
+    connection.exec_driver_sql(ddl)
+
+    # Seules les colonnes présentes dans l'ancienne table sont recopiées
+    existing = {row.name for row in connection.exec_driver_sql(
+        f"SELECT name FROM pragma_table_info('{table.name}')"
+    )}
+    copied = [column for column in table.columns if column.name in existing]
+    # Une colonne remplie par la base (server_default) mais vide dans l'ancienne table
+    # (ex: created_at d'une ligne écrite sans valeur par défaut) reçoit cette valeur
+    values = [f'COALESCE({column.name}, {column.server_default.arg.compile(dialect=connection.dialect)})'
+              if column.server_default is not None else column.name
+              for column in copied]
+    connection.exec_driver_sql(
+        f'INSERT INTO {temporary} ({", ".join(column.name for column in copied)}) '
+        f'SELECT {", ".join(values)} FROM {table.name}'
+    )
+    connection.exec_driver_sql(f'DROP TABLE {table.name}')
+    connection.exec_driver_sql(f'ALTER TABLE {temporary} RENAME TO {table.name}')
+
+
+def rebuild_outdated_tables():
+    """
+    Reconstruit les tables créées par une version précédente des modèles (SQLite uniquement)
+
+    Retour:
+        list: Noms des tables reconstruites (vide si la base est déjà à jour)
+
+    À appeler après db.create_all(), avant la création des index et de l'index de recherche.
+    Tout est fait dans une seule transaction (BEGIN IMMEDIATE: aucun autre processus
+    n'écrit pendant ce temps): en cas d'erreur, la base reste telle qu'elle était.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return []
+
+    with db.engine.connect() as connection:
+        outdated = [table for table in db.metadata.sorted_tables
+                    if inspect(connection).has_table(table.name)
+                    and table_is_outdated(connection, table)]
+        if not outdated:
+            return []
+
+        # Clés étrangères désactivées pendant la reconstruction: sinon DROP TABLE posts
+        # supprimerait (ou refuserait de supprimer) les commentaires et les likes.
+        # Ce PRAGMA est sans effet dans une transaction: il est exécuté avant BEGIN.
+        connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+        try:
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+            for table in outdated:
+                rebuild_table(connection, table)
+            # Vérification finale: aucune ligne ne doit pointer vers une ligne absente
+            if connection.exec_driver_sql('PRAGMA foreign_key_check').first() is not None:
+                raise RuntimeError('Clés étrangères invalides après la reconstruction des tables')
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.exec_driver_sql('PRAGMA foreign_keys=ON')
+
+    return [table.name for table in outdated]
+
+
+# === RECHERCHE PLEIN TEXTE DES POSTS (SQLite FTS5) ===
+
+# posts_fts: Table virtuelle FTS5 qui indexe les mots du titre et du contenu des posts
+# - content='posts', content_rowid='id': L'index ne recopie pas le texte, il pointe vers la table posts
+# - tokenize='unicode61 remove_diacritics 2': Découpe en mots, ignore majuscules ET accents
+#   (ex: "reaction" trouve "Réaction")
+# Les triggers tiennent l'index à jour à chaque INSERT/UPDATE/DELETE sur posts,
+# y compris pour les suppressions groupées faites directement en SQL.
+POST_SEARCH_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        title, content, content='posts', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, content ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+)
+
+
+def create_post_search_index():
+    """
+    Crée l'index de recherche plein texte des posts (SQLite uniquement)
+
+    Retour:
+        bool: True si l'index est disponible, False sur une autre base de données
+              (la recherche utilise alors ILIKE, voir search_posts dans app.py)
+
+    Sans danger si l'index existe déjà (IF NOT EXISTS). S'il vient d'être créé
+    sur une base contenant déjà des posts, il est rempli avec ces posts ('rebuild').
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    existed = db.session.execute(
+        db.text("SELECT 1 FROM sqlite_master WHERE name = 'posts_fts'")
+    ).first() is not None
+    for ddl in POST_SEARCH_DDL:
+        db.session.execute(db.text(ddl))
+    if not existed:
+        db.session.execute(db.text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+    db.session.commit()
+    return True
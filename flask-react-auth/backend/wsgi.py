@@ -0,0 +1,31 @@
+"""
+Point d'entrée WSGI pour la production
+======================================
+Le serveur de développement de Flask (python app.py) traite les requêtes
+une par une et n'est pas fait pour la production. En production, l'application
+est servie par gunicorn, configuré dans gunicorn.conf.py.
+
+Lancement:
+    gunicorn -c gunicorn.conf.py wsgi:app
+    gunicorn -c gunicorn.conf.py -k gevent wsgi:app   (greenlets, voir Procfile)
+
+USE_GEVENT=1: Applique le monkey patching de gevent avant d'importer l'application.
+Inutile avec gunicorn -k gevent (gunicorn le fait déjà), utile pour les autres
+serveurs WSGI basés sur gevent.
+"""
+
+import os
+
+# Le monkey patching doit avoir lieu AVANT tout autre import (threading, socket, ...)
+if os.environ.get('USE_GEVENT'):
+    from gevent import monkey
+    monkey.patch_all()
+
+# L'objet 'app' est l'application Flask définie dans app.py
+from app import app, init_db
+
+# Création des tables au démarrage, voir AUTO_CREATE_TABLES dans config.py
+# Avec gunicorn, c'est fait une seule fois par le processus maître (on_starting dans
+# gunicorn.conf.py), qui désactive AUTO_CREATE_TABLES pour les workers
+if app.config['AUTO_CREATE_TABLES']:
+    init_db()